@@ -1,8 +1,12 @@
+import math
+import heapq
 import random
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from functools import reduce
 import operator
+import numpy as np
+from app.features.selections import Selection, to_records, columns, cheapest_per_match
 
 # Configure logging
 typing_logger = logging.getLogger(__name__)
@@ -13,10 +17,12 @@ class ParlayCombination:
     Represents a single parlay:
       - selections: list of bet dictionaries
       - total_odds: product of all selection odds
+      - score: search objective in log space (0.0 when not searched)
     """
-    def __init__(self, selections: List[Dict[str, Any]]):
+    def __init__(self, selections: List[Dict[str, Any]], score: float = 0.0):
         self.selections = selections
         self.total_odds = reduce(operator.mul, (s['odds'] for s in selections), 1.0)
+        self.score = score
 
     def __str__(self):
         return (
@@ -31,63 +37,201 @@ class SmartParlayBuilder:
         min_total_odds: float = 10.0,
         max_total_odds: float = 20.0,
         max_individual_odds: float = 4.0,
+        objective: str = 'confidence',
+        resolution: float = 0.02,
+        max_pool: int = 60,
+        jitter: float = 0.15,
     ):
+        if objective not in ('confidence', 'expected_value'):
+            raise ValueError(f"Unknown parlay objective: {objective}")
         self.min_legs = min_legs
         self.max_legs = max_legs
         self.min_total_odds = min_total_odds
         self.max_total_odds = max_total_odds
         self.max_individual_odds = max_individual_odds
+        self.objective = objective
+        self.resolution = resolution  # Log-odds bucket width of the search
+        self.max_pool = max_pool      # Caps search time on large wager dumps
+        self.jitter = jitter          # Score noise for the seeded randomized mode
 
-    def _filter_selections(self, selections: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _filter_selections(self, selections: List[Dict[str, Any]]) -> List[Selection]:
         """
         Keep only 'match_winner' market bets with reasonable odds,
-        and dedupe per match by lowest odds.
+        and dedupe per match by lowest odds. Runs over column arrays.
         """
         typing_logger.info("Filtering %d raw selections", len(selections))
-        filtered = [s for s in selections
-                    if s.get('market') == 'match_winner'
-                    and 1.01 < s.get('odds', 0) <= self.max_individual_odds]
-        unique = {}
-        for s in filtered:
-            key = (s['home_team'], s['away_team'])
-            if key not in unique or s['odds'] < unique[key]['odds']:
-                unique[key] = s
-        result = list(unique.values())
+        records = to_records(selections)
+        odds, keys, match_winner = columns(records)
+        candidates = np.flatnonzero(match_winner & (odds > 1.01) & (odds <= self.max_individual_odds))
+        result = [records[i] for i in cheapest_per_match(odds, keys, candidates)]
         typing_logger.info("Filtered down to %d selections", len(result))
         return result
 
-    def _build_parlay(self, selections: List[Dict[str, Any]]) -> ParlayCombination:
+    def _leg_score(self, selection: Dict[str, Any]) -> float:
         """
-        Build a single random parlay:
-          1. Choose a random size between min_legs and max_legs (capped to pool size).
-          2. Sample that many selections.
-          3. Sort by odds and include until max_total_odds is breached.
+        Log-space score of one leg. Uses a model probability when the
+        selection carries one, otherwise the implied probability.
+        'expected_value' needs a model probability: against the implied
+        one every leg would score log(1) = 0.
         """
-        size = random.randint(self.min_legs, min(self.max_legs, len(selections)))
-        picks = random.sample(selections, size)
-        picks.sort(key=lambda x: x['odds'])
+        odds = selection['odds']
+        probability = selection.get('probability')
+        if self.objective == 'expected_value':
+            if not probability:
+                raise ValueError(
+                    f"Objective 'expected_value' needs a model probability: "
+                    f"{selection.get('home_team')} vs {selection.get('away_team')} has none"
+                )
+            return math.log(probability * odds)
+        return math.log(probability or 1 / odds)
 
-        chosen = []
-        cum_odds = 1.0
-        for pick in picks:
-            new_odds = cum_odds * pick['odds']
-            if new_odds <= self.max_total_odds:
-                chosen.append(pick)
-                cum_odds = new_odds
-        # Ensure minimum legs and minimum odds
-        if len(chosen) < self.min_legs or cum_odds < self.min_total_odds:
-            # Retry until a valid parlay is found
-            return self._build_parlay(selections)
-        return ParlayCombination(chosen)
+    def search_parlays(
+        self,
+        selections: List[Dict[str, Any]],
+        top_n: int = 1,
+        seed: Optional[int] = None,
+        keep: Optional[int] = None
+    ) -> List[ParlayCombination]:
+        """
+        Approximate top-N parlay search in log-odds space.
+          1. Score every leg and keep the best `max_pool` legs (see _pool).
+          2. Dynamic programming over (legs, log-odds bucket) states, keeping
+             the `keep` (default `top_n`) best partial parlays per state,
+             highest score first.
+          3. Return parlays whose exact odds fall in [min_total_odds, max_total_odds].
+        Merging partial parlays into a bucket drops the lower-scoring ones,
+        whose log odds differ by less than `resolution`. A parlay is merged at
+        most once per leg, so the best result scores at least as high as any
+        parlay (from the pool) with odds in
+        [min_total_odds * e^(max_legs * resolution), max_total_odds * e^(-max_legs * resolution)],
+        i.e. odds in [12.7, 15.7] with the defaults.
+        Runtime is bounded by max_pool * max_legs * buckets * keep.
+        A seed adds reproducible noise to leg scores to surface alternatives.
+        """
+        keep = keep or top_n
+        rng = random.Random(seed) if seed is not None else None
+        legs = []
+        for selection in selections:
+            score = self._leg_score(selection)
+            if rng:
+                score += rng.gauss(0, self.jitter)
+            legs.append((score, math.log(selection['odds']), selection))
+        log_min = math.log(self.min_total_odds)
+        log_max = math.log(self.max_total_odds)
+        legs = self._pool(legs, log_min)
+
+        # (legs, bucket) -> min-heap of (score, log_odds, leg indices)
+        states = {(0, 0): [(0.0, 0.0, ())]}
+        for idx, (leg_score, leg_log, _) in enumerate(legs):
+            updates = []
+            for (count, _), entries in states.items():
+                if count >= self.max_legs:
+                    continue
+                for score, log_odds, picks in entries:
+                    new_log = log_odds + leg_log
+                    if new_log <= log_max + 1e-9:
+                        # Buckets are aligned on log_min so no bucket straddles the window edge
+                        key = (count + 1, math.floor((new_log - log_min) / self.resolution))
+                        updates.append((key, (score + leg_score, new_log, picks + (idx,))))
+            for key, entry in updates:
+                heap = states.setdefault(key, [])
+                if len(heap) < keep:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+
+        candidates = sorted(
+            (
+                entry for (count, _), entries in states.items()
+                if count >= max(self.min_legs, 1)
+                for entry in entries
+                if entry[1] >= log_min - 1e-9
+            ),
+            reverse=True
+        )
+        return [
+            ParlayCombination([legs[i][2] for i in picks], score=score)
+            for score, _, picks in candidates[:top_n]
+        ]
 
-    def generate_parlay(self, selections: List[Dict[str, Any]]) -> ParlayCombination:
+    def _pool(self, legs: List[tuple], log_min: float) -> List[tuple]:
+        """
+        The best `max_pool` legs by score. Short-priced legs score highest
+        under 'confidence', so when no `max_legs` of those could reach
+        min_total_odds, the longest-priced legs are swapped in for the
+        weakest ones; the window stays reachable whenever the full set can.
+        """
+        if len(legs) <= self.max_pool:
+            return legs
+        pool = heapq.nlargest(self.max_pool, range(len(legs)), key=lambda i: legs[i][0])
+        if sum(heapq.nlargest(self.max_legs, (legs[i][1] for i in pool))) < log_min - 1e-9:
+            longest = heapq.nlargest(min(self.max_legs, self.max_pool), range(len(legs)), key=lambda i: legs[i][1])
+            reserved = set(longest)
+            pool = longest + [i for i in pool if i not in reserved][:self.max_pool - len(longest)]
+            pool.sort(key=lambda i: legs[i][0], reverse=True)
+        return [legs[i] for i in pool]
+
+    def _build_parlay(self, selections: List[Dict[str, Any]], seed: Optional[int] = None) -> ParlayCombination:
+        """Best parlay within the odds window, or an empty one when none exists."""
+        parlays = self.search_parlays(selections, top_n=1, seed=seed)
+        if not parlays:
+            typing_logger.warning(
+                "No parlay between %.2f and %.2f from %d selections",
+                self.min_total_odds, self.max_total_odds, len(selections)
+            )
+            return ParlayCombination([])
+        return parlays[0]
+
+    def generate_parlay(self, selections: List[Dict[str, Any]], seed: Optional[int] = None) -> ParlayCombination:
         """
         Public method to filter input and build a new parlay.
         Intended to be called whenever the user clicks the "Generate Parlay" button.
+        Pass a seed for a reproducible randomized alternative to the best parlay.
         """
         clean = self._filter_selections(selections)
         if not clean:
             typing_logger.warning("No valid selections after filtering.")
             return ParlayCombination([])
-        return self._build_parlay(clean)
- 
+        return self._build_parlay(clean, seed=seed)
+
+    def generate_batch(
+        self,
+        selections: List[Dict[str, Any]],
+        count: int = 5,
+        max_overlap: float = 0.5,
+        oversample: int = 20
+    ) -> List[ParlayCombination]:
+        """
+        Ranked batch of distinct parlays from one filtered pool.
+        Parlays are accepted best-first and skipped when they share more than
+        `max_overlap` (Jaccard, by match) of their legs with one already accepted.
+        When one search runs dry (on large dumps of short prices the top
+        candidates all share legs), the matches of every accepted parlay are
+        excluded and the remaining legs are searched again, until `count`
+        parlays are found or no further parlay fits the odds window.
+        """
+        clean = self._filter_selections(selections)
+        if not clean:
+            typing_logger.warning("No valid selections after filtering.")
+            return []
+
+        batch = []
+        accepted_keys = []
+        remaining = clean
+        while remaining and len(batch) < count:
+            before = len(batch)
+            # A small per-state keep spreads candidates over many leg counts and odds buckets
+            for parlay in self.search_parlays(remaining, top_n=(count - len(batch)) * oversample, keep=2):
+                keys = {s.match_key for s in parlay.selections}
+                if any(len(keys & other) / len(keys | other) > max_overlap for other in accepted_keys):
+                    continue
+                batch.append(parlay)
+                accepted_keys.append(keys)
+                if len(batch) >= count:
+                    break
+            if len(batch) == before:
+                break
+            used = set().union(*accepted_keys)
+            remaining = [s for s in remaining if s.match_key not in used]
+        typing_logger.info("Built batch of %d parlays from %d selections", len(batch), len(clean))
+        return batch
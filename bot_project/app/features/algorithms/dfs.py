@@ -1,35 +1,32 @@
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional
 from app.features.data_processing import ProcessedMatch
+from app.features.best_price import BestPriceIndex
 
-def detect_arbitrage(matches: List[ProcessedMatch]) -> Dict[str, List[Dict]]:
+def detect_arbitrage(matches: List[ProcessedMatch], price_index: Optional[BestPriceIndex] = None) -> Dict[str, List[Dict]]:
     """
     Find arbitrage opportunities within individual matches using bookmaker odds
     Returns: {arbitrage_opportunities: [...]}
     """
     opportunities = []
+    index = price_index or BestPriceIndex.from_matches(matches)
     
     for match in matches:
         try:
-            best_home = max((odds for bm in match['bookmakers'].values() 
-                           if (odds := bm['home']) is not None), default=None)
-            best_away = max((odds for bm in match['bookmakers'].values() 
-                           if (odds := bm['away']) is not None), default=None)
-            best_draw = max((odds for bm in match['bookmakers'].values() 
-                           if (odds := bm['draw']) is not None), default=None)
+            match_id = match['match_id']
+            best_home = index.best_price(match_id, 'home')
+            best_away = index.best_price(match_id, 'away')
+            best_draw = index.best_price(match_id, 'draw')
 
             if all([best_home, best_away, best_draw]):
                 total_implied_prob = (1/best_home + 1/best_away + 1/best_draw)
                 roi = (1 - total_implied_prob) * 100
                 
                 if total_implied_prob < 1:  # ROI > 0%
-                    # Find bookmakers offering these odds
-                    home_bms = [bm for bm, odds in match['bookmakers'].items() 
-                              if odds['home'] == best_home]
-                    away_bms = [bm for bm, odds in match['bookmakers'].items() 
-                              if odds['away'] == best_away]
-                    draw_bms = [bm for bm, odds in match['bookmakers'].items() 
-                              if odds['draw'] == best_draw]
+                    # Bookmakers offering these odds
+                    home_bms = index.bookmakers_at_best(match_id, 'home')
+                    away_bms = index.bookmakers_at_best(match_id, 'away')
+                    draw_bms = index.bookmakers_at_best(match_id, 'draw')
                     
                     opportunities.append({
                         'home_team': match['home_team'],
@@ -1,39 +1,107 @@
+import warnings
 import numpy as np
-from typing import List, Dict
-from app.features.data_processing import ProcessedMatch
+from typing import List, Dict, Optional
+from app.features.data_processing import ProcessedMatch, build_odds_tensor
 
-def implied_probability_threshold_model(matches: List[ProcessedMatch], threshold: float = 0.4) -> Dict[str, List[Dict]]:
+def _remove_margin_proportional(probs: np.ndarray) -> np.ndarray:
+    """Scale every outcome by the booksum"""
+    return probs / probs.sum(axis=1, keepdims=True)
+
+def _remove_margin_additive(probs: np.ndarray) -> np.ndarray:
+    """Subtract an equal share of the overround from every outcome"""
+    margin = (probs.sum(axis=1, keepdims=True) - 1) / probs.shape[1]
+    return np.clip(probs - margin, 1e-6, None)
+
+def _remove_margin_power(probs: np.ndarray, iterations: int = 20) -> np.ndarray:
+    """Solve sum(p ** k) == 1 per row with Newton's method"""
+    k = np.ones((probs.shape[0], 1))
+    log_probs = np.log(probs)
+    for _ in range(iterations):
+        powered = probs ** k
+        f = powered.sum(axis=1, keepdims=True) - 1
+        df = (powered * log_probs).sum(axis=1, keepdims=True)
+        k = k - f / np.where(df == 0, -1.0, df)
+    return _remove_margin_proportional(probs ** k)
+
+def _remove_margin_shin(probs: np.ndarray, iterations: int = 20) -> np.ndarray:
+    """Shin's insider-trading model, solved by fixed-point iteration on z"""
+    n = probs.shape[1]
+    booksum = probs.sum(axis=1, keepdims=True)
+    z = np.zeros((probs.shape[0], 1))
+    for _ in range(iterations):
+        roots = np.sqrt(z ** 2 + 4 * (1 - z) * probs ** 2 / booksum)
+        z = np.clip((roots.sum(axis=1, keepdims=True) - 2) / (n - 2), 0.0, 0.99)
+    roots = np.sqrt(z ** 2 + 4 * (1 - z) * probs ** 2 / booksum)
+    return _remove_margin_proportional((roots - z) / (2 * (1 - z)))
+
+MARGIN_METHODS = {
+    'proportional': _remove_margin_proportional,
+    'additive': _remove_margin_additive,
+    'power': _remove_margin_power,
+    'shin': _remove_margin_shin
+}
+
+def implied_probability_batch(
+    odds_tensor: np.ndarray,
+    thresholds: np.ndarray,
+    margin_method: str = 'proportional'
+) -> Dict[str, np.ndarray]:
+    """
+    Batched IPT over a (matches, bookmakers, outcomes) price tensor
+    Returns: {probabilities, predictions, valid}
+    - probabilities: margin-free (home, away, draw) per match
+    - predictions: 0 = home, 1 = away, -1 = no clear favorite
     """
-    Predict outcomes based on implied probabilities
+    if margin_method not in MARGIN_METHODS:
+        raise ValueError(f"Unknown margin method: {margin_method}")
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN rows are flagged invalid below
+        consensus = np.nanmedian(1 / odds_tensor, axis=1)
+    valid = ~np.isnan(consensus).any(axis=1)
+
+    probabilities = np.full(consensus.shape, np.nan)
+    if valid.any():
+        probabilities[valid] = MARGIN_METHODS[margin_method](consensus[valid])
+
+    predictions = np.where(
+        probabilities[:, 0] > thresholds, 0,
+        np.where(probabilities[:, 1] > thresholds, 1, -1)
+    )
+    return {'probabilities': probabilities, 'predictions': predictions, 'valid': valid}
+
+def implied_probability_threshold_model(
+    matches: List[ProcessedMatch],
+    threshold: float = 0.4,
+    margin_method: str = 'proportional',
+    league_thresholds: Optional[Dict[str, float]] = None
+) -> Dict[str, List[Dict]]:
+    """
+    Predict outcomes based on margin-free implied probabilities
     Returns: {predictions: [...]}
     """
-    predictions = []
-    
-    for match in matches:
-        try:
-            home_prob = np.median([1/o for o in match['home_odds']])
-            away_prob = np.median([1/o for o in match['away_odds']])
-            draw_prob = np.median([1/o for o in match['draw_odds']])
-            
-            total = home_prob + away_prob + draw_prob
-            home_prob /= total
-            away_prob /= total
-            
-            prediction = (
-                "Home Win" if home_prob > threshold else
-                "Away Win" if away_prob > threshold else
-                "No Clear Favorite"
-            )
-            
-            predictions.append({
-                'match_id': match['match_id'],
-                'prediction': "Home Win" if home_prob > threshold else "Away Win" if away_prob > threshold else "No Clear Favorite",
-                'home_team': match['home_team'],   
-                'away_team': match['away_team'],
-                'home_prob': round(home_prob, 2),
-                'away_prob': round(away_prob, 2)
-            })
-        except:
-            continue
-            
-    return {'predictions': predictions} if predictions else {'error': 'no_predictions'}
\ No newline at end of file
+    if not matches:
+        return {'error': 'no_predictions'}
+
+    league_thresholds = league_thresholds or {}
+    thresholds = np.array([league_thresholds.get(m.get('league'), threshold) for m in matches])
+
+    batch = implied_probability_batch(build_odds_tensor(matches), thresholds, margin_method)
+    labels = {0: "Home Win", 1: "Away Win", -1: "No Clear Favorite"}
+
+    predictions = [
+        {
+            'match_id': match['match_id'],
+            'league': match.get('league', 'Unknown'),
+            'prediction': labels[int(pred)],
+            'home_team': match['home_team'],
+            'away_team': match['away_team'],
+            'home_prob': round(float(probs[0]), 2),
+            'away_prob': round(float(probs[1]), 2),
+            'draw_prob': round(float(probs[2]), 2)
+        }
+        for match, probs, pred, ok in zip(matches, batch['probabilities'], batch['predictions'], batch['valid'])
+        if ok
+    ]
+
+    return {'predictions': predictions} if predictions else {'error': 'no_predictions'}
@@ -1,22 +1,23 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 from app.features.data_processing import ProcessedMatch
+from app.features.best_price import BestPriceIndex
 
-def odds_comparison_model(matches: List[ProcessedMatch]) -> Dict[str, List[Dict]]:
+def odds_comparison_model(matches: List[ProcessedMatch], price_index: Optional[BestPriceIndex] = None) -> Dict[str, List[Dict]]:
     value_bets = []
+    index = price_index or BestPriceIndex.from_matches(matches)
     
     for match in matches:
         try:
-            best_home = max((odds for odds in match['home_odds'] if odds is not None), default=None)
-            best_away = max((odds for odds in match['away_odds'] if odds is not None), default=None)
+            match_id = match['match_id']
+            best_home = index.best_price(match_id, 'home')
+            best_away = index.best_price(match_id, 'away')
             
-            # Find bookmakers offering best odds
-            home_bookmakers = [bm for bm, odds in match['bookmakers'].items() 
-                             if odds['home'] == best_home]
-            away_bookmakers = [bm for bm, odds in match['bookmakers'].items() 
-                             if odds['away'] == best_away]
+            # Bookmakers offering best odds come straight from the index
+            home_bookmakers = index.bookmakers_at_best(match_id, 'home')
+            away_bookmakers = index.bookmakers_at_best(match_id, 'away')
             
             value_bets.append({
-                'match_id': match['match_id'],
+                'match_id': match_id,
                 'home_team': match['home_team'],
                 'away_team': match['away_team'],
                 'best_home_odds': best_home,
@@ -28,4 +29,4 @@ def odds_comparison_model(matches: List[ProcessedMatch]) -> Dict[str, List[Dict]
         except Exception as e:
             continue
             
-    return {'value_bets': value_bets}
\ No newline at end of file
+    return {'value_bets': value_bets}
@@ -0,0 +1,98 @@
+"""Top-k best-price index across bookmakers"""
+import heapq
+import logging
+from typing import List, Dict, Tuple, Optional
+from app.features.data_processing import ProcessedMatch, OUTCOMES
+
+logger = logging.getLogger('OddsBot')
+
+# (price, bookmaker) pairs, best price first
+PriceList = List[Tuple[float, str]]
+
+class BestPriceIndex:
+    """
+    Per (match, outcome) top-k prices built once per odds snapshot.
+    Full price maps are kept so single-price updates never need a rescan
+    of the snapshot, only of the bookmakers quoting that one outcome.
+    """
+
+    def __init__(self, k: int = 3):
+        self.k = k
+        self._prices: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._top: Dict[Tuple[str, str], PriceList] = {}
+        self._leagues: Dict[str, set] = {}
+
+    @classmethod
+    def from_matches(cls, matches: List[ProcessedMatch], k: int = 3) -> 'BestPriceIndex':
+        """Build the index from preprocessed matches"""
+        index = cls(k)
+        for match in matches:
+            index.add_match(match)
+        logger.debug(f"Built best-price index for {len(matches)} matches")
+        return index
+
+    def add_match(self, match: ProcessedMatch) -> None:
+        """Index (or re-index) every bookmaker price of one match"""
+        match_id = match['match_id']
+        self._leagues.setdefault(match.get('league', 'Unknown'), set()).add(match_id)
+        for outcome in OUTCOMES:
+            prices = {
+                bm: price for bm, odds in match.get('bookmakers', {}).items()
+                if (price := odds.get(outcome)) is not None
+            }
+            self._prices[(match_id, outcome)] = prices
+            self._rebuild(match_id, outcome)
+
+    def update(self, match_id: str, bookmaker: str, outcome: str, price: Optional[float]) -> None:
+        """Apply a single price change; None removes the bookmaker's quote"""
+        key = (match_id, outcome)
+        prices = self._prices.setdefault(key, {})
+        top = self._top.get(key, [])
+        was_top = any(bm == bookmaker for _, bm in top)
+
+        if price is None:
+            prices.pop(bookmaker, None)
+        else:
+            prices[bookmaker] = price
+
+        # Only touch the sorted list when the change can affect it
+        enters_top = price is not None and (len(top) < self.k or price > top[-1][0])
+        if was_top or enters_top:
+            self._rebuild(match_id, outcome)
+
+    def best(self, match_id: str, outcome: str, n: Optional[int] = None) -> PriceList:
+        """Top prices for one (match, outcome), best first"""
+        return self._top.get((match_id, outcome), [])[:n or self.k]
+
+    def best_price(self, match_id: str, outcome: str) -> Optional[float]:
+        """Single best price or None when nobody quotes the outcome"""
+        top = self._top.get((match_id, outcome))
+        return top[0][0] if top else None
+
+    def bookmakers_at_best(self, match_id: str, outcome: str) -> List[str]:
+        """Every bookmaker offering the best price, including ties beyond the top-k"""
+        top = self._top.get((match_id, outcome))
+        if not top:
+            return []
+        best = top[0][0]
+        return [bm for bm, price in self._prices[(match_id, outcome)].items() if price == best]
+
+    def best_across(self, outcome: str, league: Optional[str] = None, n: int = 3) -> List[Tuple[float, str, str]]:
+        """
+        Best prices for an outcome across matches, optionally within one league
+        Returns: [(price, bookmaker, match_id), ...]
+        """
+        match_ids = self._leagues.get(league, set()) if league else {m for m, _ in self._top}
+        candidates = (
+            (price, bm, match_id)
+            for match_id in match_ids
+            for price, bm in self._top.get((match_id, outcome), [])
+        )
+        return heapq.nlargest(n, candidates, key=lambda x: x[0])
+
+    def _rebuild(self, match_id: str, outcome: str) -> None:
+        """Recompute the top-k list for one (match, outcome)"""
+        prices = self._prices.get((match_id, outcome), {})
+        self._top[(match_id, outcome)] = [
+            (price, bm) for bm, price in heapq.nlargest(self.k, prices.items(), key=lambda x: x[1])
+        ]
@@ -2,14 +2,92 @@ import asyncio
 import logging
 import hashlib
 import numpy as np
-from typing import List, Dict, Union, Any
-from app.features.odds_fetcher import fetch_odds_for_league
+from datetime import datetime, timezone
+from typing import List, Dict, Union, Any, Awaitable, Callable, NamedTuple, Optional
+from app.features.odds_fetcher import fetch_odds_for_league, upcoming_window
+from utils.cache import LRUCache
 
 logger = logging.getLogger('OddsBot')
 
 # Define the ProcessedMatch type with bookmaker data
 ProcessedMatch = Dict[str, Union[str, List[float], Dict[str, Dict[str, float]]]]
 
+# Outcome order used by every array-based algorithm
+OUTCOMES = ('home', 'away', 'draw')
+
+# Algorithms that read best prices from a shared BestPriceIndex
+PRICE_INDEX_ALGORITHMS = {'arb', 'value'}
+
+# Data subset the algorithm pipeline declares upstream: pre-match EU prices for
+# the coming week. Every algorithm shares one snapshot per league, so there is
+# one filter for all of them; bookmakers are not narrowed so arb and value
+# still compare every book.
+PIPELINE_REGIONS = ('eu',)
+PIPELINE_DAYS_AHEAD = 7
+
+def pipeline_fetch_filter() -> Dict[str, Any]:
+    return {'regions': PIPELINE_REGIONS, **upcoming_window(PIPELINE_DAYS_AHEAD)}
+
+class OddsSnapshot(NamedTuple):
+    """One league's preprocessed matches and the best-price index built from them"""
+    matches: List[ProcessedMatch]
+    price_index: Any  # BestPriceIndex; imported lazily, it imports this module
+
+def make_snapshot(matches: List[ProcessedMatch]) -> OddsSnapshot:
+    """Index a freshly loaded snapshot once, so every request reuses the index"""
+    from app.features.best_price import BestPriceIndex
+    return OddsSnapshot(matches, BestPriceIndex.from_matches(matches))
+
+# Preprocessed odds (OddsSnapshot) per league, shared by all users. Past the soft TTL a
+# snapshot is still served while one background fetch replaces it; only
+# after the hard TTL does a request wait on the API again.
+ODDS_SOFT_TTL = 120
+ODDS_HARD_TTL = 900
+odds_cache = LRUCache(max_entries=256, ttl=ODDS_HARD_TTL, name='league-odds', jitter=0.15)
+_snapshot_store = None
+
+def get_snapshot_store():
+    """Disk tier behind odds_cache, created on first use"""
+    global _snapshot_store
+    if _snapshot_store is None:
+        from config.settings import SNAPSHOT_CACHE_DIR
+        from app.features.snapshot_store import SnapshotStore
+        _snapshot_store = SnapshotStore(SNAPSHOT_CACHE_DIR, max_age=ODDS_HARD_TTL)
+    return _snapshot_store
+
+def warm_from_disk(league_key: str) -> bool:
+    """
+    Seed odds_cache from the disk tier after a restart or eviction.
+    The snapshot keeps its real age, so an old one is served stale and refreshed.
+    """
+    try:
+        loaded = get_snapshot_store().load(league_key)
+    except OSError as e:
+        logger.warning(f"Snapshot store unavailable: {str(e)}")
+        return False
+    if loaded is None:
+        return False
+    matches, age = loaded
+    odds_cache.set(league_key, make_snapshot(matches), ttl=ODDS_HARD_TTL - age, soft_ttl=max(ODDS_SOFT_TTL - age, 0))
+    logger.info(f"Loaded {len(matches)} matches for {league_key} from disk ({age:.0f}s old)")
+    return True
+
+def build_odds_tensor(matches: List[ProcessedMatch]) -> np.ndarray:
+    """
+    Stack bookmaker prices into a (matches, bookmakers, outcomes) array.
+    Missing or invalid prices are NaN so reductions can use nan-aware numpy functions.
+    """
+    width = max((len(m.get('bookmakers', {})) for m in matches), default=0)
+    tensor = np.full((len(matches), max(width, 1), len(OUTCOMES)), np.nan)
+    
+    for i, match in enumerate(matches):
+        rows = [[prices.get(o) for o in OUTCOMES] for prices in match.get('bookmakers', {}).values()]
+        if rows:
+            tensor[i, :len(rows)] = np.array(rows, dtype=float)
+    
+    tensor[tensor <= 1.0] = np.nan
+    return tensor
+
 def preprocess_odds(raw_odds: List[Dict]) -> List[ProcessedMatch]:
     """
     Robust preprocessing with error handling and bookmaker data storage.
@@ -32,6 +110,7 @@ def preprocess_odds(raw_odds: List[Dict]) -> List[ProcessedMatch]:
             # Initialize match data structure
             odds_data: ProcessedMatch = {
                 'match_id': match_id,
+                'league': match.get('sport_key', 'Unknown'),
                 'home_team': home_team,
                 'away_team': away_team,
                 'commence_time': commence_time,
@@ -88,25 +167,64 @@ async def process_pipeline(
     base_url: str,
     league_key: str,
     algorithm: str,
-    paid_user: bool
+    paid_user: bool,
+    progress: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None,
+    ingestor=None
 ) -> Dict[str, Any]:
     """
     Robust processing pipeline with error handling and algorithm execution.
     Returns results from the selected algorithm or an error message.
+    progress, when given, is awaited with ('fetched', {'events'}),
+    ('preprocessed', {'matches', 'cached'}) and ('analyzing', {'matches'}).
+    ingestor, when given (an OddsIngestor), stores every fetched snapshot
+    in the odds database through the async engine.
     """
+    async def report(stage: str, **info):
+        if progress is None:
+            return
+        try:
+            await progress(stage, info)
+        except Exception as e:  # Progress output must never fail the analysis
+            logger.warning(f"Progress callback failed at {stage}: {str(e)}")
+
     try:
-        # Fetch raw data from the API
-        raw_data = await fetch_odds_for_league(api_key, base_url, league_key)
+        # Stages are reported only when this request waits on the load, not
+        # from a background refresh that outlives it
+        waiting = league_key not in odds_cache and not await asyncio.to_thread(warm_from_disk, league_key)
+
+        async def load_snapshot():
+            # None is not cached, so a failed fetch is retried by the next request
+            fetched_at = datetime.now(timezone.utc)
+            raw_data = await fetch_odds_for_league(api_key, base_url, league_key, pipeline_fetch_filter())
+            if not raw_data:
+                return None
+            if waiting:
+                await report('fetched', events=len(raw_data))
+            if ingestor is not None:
+                try:
+                    await ingestor.ingest_async(raw_data, fetched_at)
+                except Exception as e:  # Storage failures never block the analysis
+                    logger.warning(f"Could not store odds for {league_key}: {str(e)}")
+            processed = preprocess_odds(raw_data)
+            try:
+                await asyncio.to_thread(get_snapshot_store().save, league_key, processed)
+            except OSError as e:
+                logger.warning(f"Could not persist snapshot for {league_key}: {str(e)}")
+            return make_snapshot(processed)
+
+        snapshot = await odds_cache.get_or_refresh_async(
+            league_key, load_snapshot, soft_ttl=ODDS_SOFT_TTL
+        )
         
-        if not raw_data:
+        if snapshot is None:
             return {"error": "No data fetched from API"}
-        
-        # Preprocess the raw data
-        processed_matches = preprocess_odds(raw_data)
+        processed_matches = snapshot.matches
         
         if not processed_matches:
             return {"error": "No valid matches after preprocessing"}
         
+        await report('preprocessed', matches=len(processed_matches), cached=not waiting)
+        
         # Check user payment status
         if not paid_user:
             from app.features.algorithms.demo import demo_analysis
@@ -139,11 +257,17 @@ async def process_pipeline(
         # Get the processor function
         processor = algorithm_map[algorithm]
         
-        # Execute the algorithm
+        # Price-comparison algorithms share the index cached with the snapshot
+        kwargs = {}
+        if algorithm in PRICE_INDEX_ALGORITHMS:
+            kwargs['price_index'] = snapshot.price_index
+        
+        # Execute the algorithm; sync ones run in a thread so the loop keeps serving other chats
+        await report('analyzing', matches=len(processed_matches))
         if asyncio.iscoroutinefunction(processor):
-            results = await processor(processed_matches)
+            results = await processor(processed_matches, **kwargs)
         else:
-            results = processor(processed_matches)
+            results = await asyncio.to_thread(processor, processed_matches, **kwargs)
             
         return results or {"status": "no_opportunities"}
         
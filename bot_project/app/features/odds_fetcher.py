@@ -1,10 +1,55 @@
 import aiohttp
 import logging
-from typing import List, Dict, Any
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional
+
+# Filter keys a strategy may declare -> The Odds API query parameter
+ODDS_FILTER_PARAMS = {
+    'regions': 'regions',
+    'bookmakers': 'bookmakers',
+    'commence_from': 'commenceTimeFrom',
+    'commence_to': 'commenceTimeTo'
+}
 
 logger = logging.getLogger('OddsBot')
 
-async def fetch_odds_for_league(api_key: str, base_url: str, league_key: str) -> List[Dict[str, Any]]:
+def odds_filter_params(fetch_filter: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Translate a strategy's declared data subset into upstream query parameters
+    so filtering happens server-side. List values are comma-joined.
+    The Odds API gives `bookmakers` priority over `regions` when both are sent.
+    """
+    params = {}
+    for key, value in (fetch_filter or {}).items():
+        if key not in ODDS_FILTER_PARAMS:
+            raise ValueError(f"Unknown odds filter: {key}")
+        if value:
+            params[ODDS_FILTER_PARAMS[key]] = ",".join(value) if isinstance(value, (list, tuple, set)) else str(value)
+    return params
+
+def day_window(target_date: str) -> Dict[str, str]:
+    """Commence-time filter covering one UTC day (YYYY-MM-DD)"""
+    start = datetime.strptime(target_date, "%Y-%m-%d")
+    end = start + timedelta(days=1) - timedelta(seconds=1)
+    return {
+        'commence_from': start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'commence_to': end.strftime("%Y-%m-%dT%H:%M:%SZ")
+    }
+
+def upcoming_window(days: int) -> Dict[str, str]:
+    """Commence-time filter from now to `days` ahead; events already in play are left out"""
+    start = datetime.now(timezone.utc).replace(microsecond=0)
+    return {
+        'commence_from': start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        'commence_to': (start + timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    }
+
+async def fetch_odds_for_league(
+    api_key: str,
+    base_url: str,
+    league_key: str,
+    fetch_filter: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
     """
     Fetch raw odds data from API
     Returns list of matches with complete bookmaker data
@@ -14,7 +59,8 @@ async def fetch_odds_for_league(api_key: str, base_url: str, league_key: str) ->
         "apiKey": api_key,
         "regions": "eu",
         "markets": "h2h",
-        "oddsFormat": "decimal"
+        "oddsFormat": "decimal",
+        **odds_filter_params(fetch_filter)
     }
     
     try:
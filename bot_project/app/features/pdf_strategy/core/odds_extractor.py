@@ -0,0 +1,85 @@
+"""Batch extraction of per-market prices from Odds API payloads"""
+import logging
+import numpy as np
+from typing import List, Dict, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Column name -> (market key, outcome name); team outcomes are resolved per match
+MARKET_COLUMNS = {
+    'home': ('h2h', None),
+    'away': ('h2h', None),
+    'draw': ('h2h', 'draw'),
+    'over_2.5': ('totals', 'over'),
+    'under_2.5': ('totals', 'under'),
+    'btts_yes': ('btts', 'yes'),
+    'btts_no': ('btts', 'no')
+}
+
+REQUIRED_KEYS = ('id', 'commence_time', 'home_team', 'away_team', 'bookmakers')
+
+def _price(value) -> float:
+    """A quoted price as float; None, non-numeric, non-finite or negative prices are 0.0 (missing)"""
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return price if np.isfinite(price) and price >= 0 else 0.0
+
+def extract_odds_batch(raw_matches: List[Dict], bookmaker_chain: Sequence[str]) -> Dict:
+    """
+    Turn a whole payload into per-market price arrays in one pass.
+    The first bookmaker of the chain quoting the match is used, falling
+    back to the first bookmaker listed. Missing or malformed prices are 0.0,
+    so one bad cell never fails the batch.
+    Returns: {matches, bookmakers, prices: {column: ndarray}, months: ndarray}
+    """
+    chain = [b.lower() for b in bookmaker_chain]
+    columns = list(MARKET_COLUMNS)
+    matches, used, months = [], [], []
+    rows = []
+    skipped = bad_prices = 0
+
+    for match in raw_matches:
+        if not all(key in match for key in REQUIRED_KEYS) or not match['bookmakers']:
+            skipped += 1
+            continue
+
+        by_key = {b.get('key', '').lower(): b for b in match['bookmakers']}
+        bookmaker = next((by_key[k] for k in chain if k in by_key), match['bookmakers'][0])
+
+        market_data = {
+            m['key']: {o['name'].lower(): o['price'] for o in m.get('outcomes', [])}
+            for m in bookmaker.get('markets', [])
+        }
+        h2h = market_data.get('h2h', {})
+        home = h2h.get(match['home_team'].lower(), h2h.get('home', 0.0))
+        away = h2h.get(match['away_team'].lower(), h2h.get('away', 0.0))
+
+        raw = [home, away]
+        for column in columns[2:]:
+            market, outcome = MARKET_COLUMNS[column]
+            raw.append(market_data.get(market, {}).get(outcome, 0.0))
+        row = [_price(value) for value in raw]
+        bad_prices += sum(1 for value, price in zip(raw, row) if not price and value not in (0, 0.0))
+
+        rows.append(row)
+        matches.append(match)
+        used.append(bookmaker.get('key', 'unknown'))
+        try:
+            months.append(int(match['commence_time'][5:7]))
+        except (TypeError, ValueError):
+            months.append(0)
+
+    if skipped:
+        logger.warning(f"Skipped {skipped} matches with invalid structure or no bookmakers")
+    if bad_prices:
+        logger.warning(f"Zeroed {bad_prices} malformed prices")
+
+    table = np.array(rows, dtype=float).reshape(len(rows), len(columns))
+    return {
+        'matches': matches,
+        'bookmakers': used,
+        'prices': {column: table[:, i] for i, column in enumerate(columns)},
+        'months': np.array(months, dtype=int)
+    }
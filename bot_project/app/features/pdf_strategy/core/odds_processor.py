@@ -1,45 +1,71 @@
 """Robust odds processing with validation and caching"""
 import logging
-from datetime import datetime
+import numpy as np
+from datetime import datetime, timezone
 from typing import List, Dict, Optional
 from sqlalchemy.sql import text
-from utils.cache import SimpleCache
+from utils.cache import LRUCache
 from ..rules.odds_decoder import PDFOddsDecoder
 
 logger = logging.getLogger(__name__)
 
 class OddsProcessor:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, chunk_size: int = 500):
         self.db = db_manager
-        self.cache = SimpleCache(ttl=300)
+        self.chunk_size = chunk_size
+        self.cache = LRUCache(max_entries=20000, ttl=300, name='odds-processor')
         self.decoder = PDFOddsDecoder()
         self.required_fields = {'id', 'home_odds', 'match_date', 'is_cup'}
 
     def process_matches(self, days_ahead: int = 3) -> List[Dict]:
-        """Main processing workflow with error containment"""
+        """
+        Main processing workflow with error containment.
+        Results are cached per (days_ahead, day, data version), so the query is
+        skipped entirely until new odds are written by any process or the
+        date rolls over. Without a readable version nothing is cached.
+        """
+        today = datetime.now(timezone.utc).date()  # The query window is in UTC days
+        version = self.db.get_data_version()
+        key = f"matches:{days_ahead}:{today.isoformat()}:{version}"
+        if version is not None and (cached := self.cache.get(key)) is not None:
+            return cached
         try:
-            raw_matches = self.db.get_matches_with_odds(days_ahead)
-            return [p for m in raw_matches if (p := self._process_match(m))]
+            results = []
+            for chunk in self.db.stream_matches_with_odds(days_ahead, self.chunk_size):
+                results.extend(self._process_batch([m for m in chunk if self._validate_match(m)]))
+            if version is not None:
+                self.cache.set(key, results)
+            return results
         except Exception as e:
             logger.critical(f"Processing failed: {str(e)}", exc_info=True)
             return []
 
-    def _process_match(self, match: Dict) -> Optional[Dict]:
-        """Individual match processing pipeline"""
-        if not self._validate_match(match):
-            return None
-            
-        cache_key = f"odds:{match['id']}"
-        if cached := self.cache.get(cache_key):
-            return cached
-            
-        try:
-            processed = self._create_processed_entry(match)
-            self.cache.set(cache_key, processed)
-            return processed
-        except Exception as e:
-            logger.warning(f"Skipping match {match.get('id')}: {str(e)}")
-            return None
+    def _process_batch(self, matches: List[Dict]) -> List[Dict]:
+        """Decode every uncached match in one vectorized call, preserving order"""
+        results: List[Optional[Dict]] = [self.cache.get(self._entry_key(m)) for m in matches]
+        pending = [i for i, cached in enumerate(results) if not cached]
+        
+        if pending:
+            batch = self.decoder.analyze_batch(
+                [matches[i]['home_odds'] for i in pending],
+                np.array([self._is_start_of_season(matches[i]['match_date']) for i in pending], dtype=bool)
+            )
+            for j, i in enumerate(pending):
+                try:
+                    analysis = {
+                        'prediction': batch['prediction'][j],
+                        'confidence': batch['confidence'][j]
+                    }
+                    results[i] = self._create_processed_entry(matches[i], analysis)
+                    self.cache.set(self._entry_key(matches[i]), results[i])
+                except Exception as e:
+                    logger.warning(f"Skipping match {matches[i].get('id')}: {str(e)}")
+        
+        return [r for r in results if r]
+
+    def _entry_key(self, match: Dict) -> str:
+        """Per-match cache key; includes the price so updated odds are re-decoded"""
+        return f"odds:{match['id']}:{match['home_odds']}"
 
     def _validate_match(self, match: Dict) -> bool:
         """Comprehensive data validation"""
@@ -55,13 +81,13 @@ class OddsProcessor:
             logger.warning(f"Invalid data types in match {match.get('id')}")
             return False
 
-    def _create_processed_entry(self, match: Dict) -> Dict:
+    def _create_processed_entry(self, match: Dict, analysis: Optional[Dict] = None) -> Dict:
         """Create processed match entry with analysis"""
-        is_season_start = self._is_start_of_season(match['match_date'])
-        analysis = self.decoder.analyze_odds(
-            odds=match['home_odds'],
-            is_start_of_season=is_season_start
-        )
+        if analysis is None:
+            analysis = self.decoder.analyze_odds(
+                odds=match['home_odds'],
+                is_start_of_season=self._is_start_of_season(match['match_date'])
+            )
         
         return {
             'match_id': match['id'],
@@ -1,17 +1,21 @@
 """Parlay Builder for PDF Strategy Results"""
 import math
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
 class ParlayBuilder:
-    def __init__(self, matches: List[Dict]):
+    def __init__(self, matches: List[Dict], objective: str = 'mean_confidence', max_nodes: int = 200000):
+        if objective not in ('mean_confidence', 'joint_probability'):
+            raise ValueError(f"Unknown parlay objective: {objective}")
         self.matches = matches
         self.min_legs = 2
         self.max_legs = 5
         self.target_odds_range = (5.0, 10.0)
         self.min_confidence = 0.7
+        self.objective = objective
+        self.max_nodes = max_nodes  # Search budget; the best parlay found so far is kept
 
     def generate_parlay(self) -> Dict:
         """Generate a parlay with 5-10 odds"""
@@ -30,22 +34,94 @@ class ParlayBuilder:
         ]
 
     def _select_diverse_matches(self, matches: List[Dict]) -> List[Dict]:
-        """Select diverse matches targeting 5-10 odds"""
-        leagues = set()
-        selected = []
-        total_odds = 1.0
-        for match in sorted(matches, key=lambda x: x['profit_score'], reverse=True):
-            if len(selected) >= self.max_legs or total_odds > self.target_odds_range[1]:
-                break
-            if match['league'] not in leagues:
-                odds = match['odds']['home']
-                if total_odds * odds <= self.target_odds_range[1]:
-                    selected.append(match)
-                    leagues.add(match['league'])
-                    total_odds *= odds
-            if total_odds >= self.target_odds_range[0] and len(selected) >= self.min_legs:
-                break
-        return selected if total_odds >= self.target_odds_range[0] else matches[:self.max_legs]
+        """
+        Exact branch-and-bound selection: one match per league, 2-5 legs,
+        total odds inside the target window, maximizing the objective.
+        Returns an empty list when no combination fits the window.
+        """
+        log_min, log_max = (math.log(x) for x in self.target_odds_range)
+
+        # One group per league, best confidence first; equivalent legs collapse
+        by_league = {}
+        for match in matches:
+            key = (match['analysis']['confidence'], round(match['odds']['home'], 2))
+            by_league.setdefault(match['league'], {}).setdefault(key, match)
+        groups = sorted(
+            (sorted(group.values(), key=lambda m: m['analysis']['confidence'], reverse=True)
+             for group in by_league.values()),
+            key=lambda g: g[0]['analysis']['confidence'],
+            reverse=True
+        )
+
+        # Per-suffix best confidences and log-odds, for the bounds
+        suffix_conf = [[] for _ in range(len(groups) + 1)]
+        suffix_log = [[] for _ in range(len(groups) + 1)]
+        for i in range(len(groups) - 1, -1, -1):
+            conf = groups[i][0]['analysis']['confidence']
+            log_odds = max(math.log(m['odds']['home']) for m in groups[i])
+            suffix_conf[i] = sorted(suffix_conf[i + 1] + [conf], reverse=True)[:self.max_legs]
+            suffix_log[i] = sorted(suffix_log[i + 1] + [log_odds], reverse=True)[:self.max_legs]
+
+        best: Dict = {'value': float('-inf'), 'picks': [], 'nodes': 0}
+
+        def search(i: int, picks: List[Dict], conf_sum: float, log_conf: float, log_odds: float):
+            best['nodes'] += 1
+            if best['nodes'] > self.max_nodes:
+                return
+            count = len(picks)
+            if count >= self.min_legs and log_odds >= log_min:
+                value = self._objective_value(conf_sum, log_conf, count)
+                if value > best['value']:
+                    best['value'], best['picks'] = value, list(picks)
+            if i == len(groups) or count == self.max_legs:
+                return
+
+            slots = self.max_legs - count
+            if count + len(suffix_log[i]) < self.min_legs:
+                return
+            if log_odds + sum(suffix_log[i][:slots]) < log_min:
+                return
+            bound = self._upper_bound(conf_sum, log_conf, count, suffix_conf[i][:slots], log_odds < log_min)
+            if bound is None or bound <= best['value']:
+                return
+
+            for match in groups[i]:
+                leg_log = math.log(match['odds']['home'])
+                if log_odds + leg_log > log_max:
+                    continue
+                conf = match['analysis']['confidence']
+                picks.append(match)
+                search(i + 1, picks, conf_sum + conf, log_conf + math.log(conf), log_odds + leg_log)
+                picks.pop()
+            search(i + 1, picks, conf_sum, log_conf, log_odds)
+
+        search(0, [], 0.0, 0.0, 0.0)
+        if best['nodes'] > self.max_nodes:
+            logger.warning(f"Parlay search budget of {self.max_nodes} nodes exhausted, using best found")
+        logger.debug(f"Parlay search visited {best['nodes']} nodes")
+        return best['picks']
+
+    def _objective_value(self, conf_sum: float, log_conf: float, count: int) -> float:
+        """Mean confidence, or log of the joint probability"""
+        return conf_sum / count if self.objective == 'mean_confidence' else log_conf
+
+    def _upper_bound(self, conf_sum: float, log_conf: float, count: int,
+                     remaining: List[float], below_window: bool) -> Optional[float]:
+        """Best objective reachable by adding legs from `remaining` (sorted, best first)"""
+        if self.objective == 'joint_probability':
+            # Confidences are <= 1, so only the legs still required lower the product
+            needed = max(self.min_legs - count, 1 if below_window else 0)
+            if needed > len(remaining):
+                return None
+            return log_conf + sum(math.log(c) for c in remaining[:needed])
+        bounds = []
+        running = conf_sum
+        for k in range(len(remaining) + 1):
+            if k:
+                running += remaining[k - 1]
+            if count + k >= self.min_legs:
+                bounds.append(running / (count + k))
+        return max(bounds) if bounds else None
 
     def _build_parlay(self, selections: List[Dict]) -> Dict:
         """Calculate parlay metrics"""
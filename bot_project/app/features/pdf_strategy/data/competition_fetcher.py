@@ -2,8 +2,9 @@
 import requests
 from datetime import datetime
 import logging
-from typing import Set, List, Dict
+from typing import Set, List, Dict, Optional, Any
 from config.settings import API_FOOTBALL_KEY, ODDS_API_KEY, SCRAPING_BASE_URL
+from app.features.odds_fetcher import odds_filter_params
 
 # Setup logging consistent with OddsBot
 logger = logging.getLogger(__name__)
@@ -119,37 +120,85 @@ def match_leagues_to_odds_api(competitions: Set[str]) -> List[str]:
     logger.info(f"Matched {len(matched_leagues)} leagues: {matched_leagues}")
     return matched_leagues
 
-def fetch_odds_for_leagues(sport_keys: List[str], selected_markets: Set[str]) -> List[Dict]:
-    """Fetch odds from The Odds API for matched leagues and selected markets."""
+def fetch_odds_for_leagues(
+    sport_keys: List[str],
+    selected_markets: Set[str],
+    fetch_filter: Optional[Dict[str, Any]] = None
+) -> List[Dict]:
+    """
+    Fetch odds from The Odds API for matched leagues and selected markets.
+    All markets are requested in one call per league; per-market calls are
+    only used when the upstream rejects the combined request. Events are
+    merged by id so each appears once with all of its markets.
+    fetch_filter (regions, bookmakers, commence_from/to) is applied upstream.
+    """
     all_matches = []
+    markets = sorted(selected_markets)
     for sport_key in sport_keys:
-        for market in selected_markets:
-            try:
-                logger.info(f"Fetching {market} odds for {sport_key}")
-                response = requests.get(
-                    f"{ODDS_API_BASE_URL}/sports/{sport_key}/odds",
-                    params={
-                        "apiKey": ODDS_API_KEY,
-                        "regions": "eu,uk,us,au",  # Broader regions for more odds
-                        "markets": market,
-                        "oddsFormat": "decimal",
-                        "dateFormat": "iso"
-                    },
-                    timeout=10
-                )
-                response.raise_for_status()
-                matches = response.json()
-                today_matches = [m for m in matches if is_today_match(m.get("commence_time"))]
-                if today_matches and sport_key == "soccer_usa_mls":
-                    logger.debug(f"Sample MLS match: {today_matches[0]}")
-                all_matches.extend(today_matches)
-                logger.info(f"Fetched {len(today_matches)} {market} matches for {sport_key}")
-            except requests.exceptions.HTTPError as e:
-                logger.debug(f"HTTP error for {sport_key}, market {market}: {str(e)} - {response.text}")
-            except Exception as e:
-                logger.error(f"Error fetching odds for {sport_key}, market {market}: {str(e)}")
-    logger.info(f"Total matches fetched: {len(all_matches)}")
-    return all_matches
+        try:
+            logger.info(f"Fetching {','.join(markets)} odds for {sport_key}")
+            events = _request_odds(sport_key, markets, fetch_filter)
+        except requests.exceptions.HTTPError as e:
+            if len(markets) == 1:
+                logger.debug(f"HTTP error for {sport_key}, market {markets[0]}: {str(e)} - {e.response.text}")
+                continue
+            logger.info(f"Combined market request rejected for {sport_key}, falling back to per-market requests")
+            events = []
+            for market in markets:
+                try:
+                    events.extend(_request_odds(sport_key, [market], fetch_filter))
+                except requests.exceptions.HTTPError as e:
+                    logger.debug(f"HTTP error for {sport_key}, market {market}: {str(e)} - {e.response.text}")
+                except Exception as e:
+                    logger.error(f"Error fetching odds for {sport_key}, market {market}: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error fetching odds for {sport_key}: {str(e)}")
+            continue
+        # The commence-time window is applied upstream; this is only a guard
+        today_matches = [m for m in events if is_today_match(m.get("commence_time"))]
+        all_matches.extend(today_matches)
+        logger.info(f"Fetched {len(today_matches)} market payloads for {sport_key}")
+    merged = merge_events(all_matches)
+    logger.info(f"Total matches fetched: {len(merged)} ({len(all_matches)} payloads before merge)")
+    return merged
+
+def _request_odds(sport_key: str, markets: List[str], fetch_filter: Optional[Dict[str, Any]] = None) -> List[Dict]:
+    """Single Odds API request for one league and one or more markets."""
+    response = requests.get(
+        f"{ODDS_API_BASE_URL}/sports/{sport_key}/odds",
+        params={
+            "apiKey": ODDS_API_KEY,
+            "regions": "eu,uk,us,au",  # Broader regions for more odds
+            "markets": ",".join(markets),
+            "oddsFormat": "decimal",
+            "dateFormat": "iso",
+            **odds_filter_params(fetch_filter)
+        },
+        timeout=10
+    )
+    response.raise_for_status()
+    return response.json()
+
+def merge_events(events: List[Dict]) -> List[Dict]:
+    """Merge duplicate events by id into one record holding every bookmaker market."""
+    merged: Dict[str, Dict] = {}
+    for event in events:
+        event_id = event.get("id")
+        if event_id not in merged:
+            merged[event_id] = {**event, "bookmakers": [
+                {**b, "markets": list(b.get("markets", []))} for b in event.get("bookmakers", [])
+            ]}
+            continue
+        target = {b.get("key"): b for b in merged[event_id]["bookmakers"]}
+        for bookmaker in event.get("bookmakers", []):
+            existing = target.get(bookmaker.get("key"))
+            if existing is None:
+                existing = {**bookmaker, "markets": []}
+                merged[event_id]["bookmakers"].append(existing)
+                target[bookmaker.get("key")] = existing
+            known = {m.get("key") for m in existing["markets"]}
+            existing["markets"].extend(m for m in bookmaker.get("markets", []) if m.get("key") not in known)
+    return list(merged.values())
 
 def is_today_match(commence_time: str) -> bool:
     """Check if a match is scheduled for today."""
@@ -163,7 +212,11 @@ def is_today_match(commence_time: str) -> bool:
         logger.error(f"Error parsing commence_time {commence_time}: {str(e)}")
         return False
 
-def integrate_into_strategy_engine(selected_markets: Set[str], target_date: str = None) -> List[Dict]:
+def integrate_into_strategy_engine(
+    selected_markets: Set[str],
+    target_date: str = None,
+    fetch_filter: Optional[Dict[str, Any]] = None
+) -> List[Dict]:
     """Integrate API-Football league discovery with Odds API odds fetching."""
     competitions = get_todays_competitions(target_date)
     if not competitions:
@@ -173,7 +226,7 @@ def integrate_into_strategy_engine(selected_markets: Set[str], target_date: str
     if not matched_sport_keys:
         logger.warning("No leagues matched to Odds API keys")
         return []
-    matches = fetch_odds_for_leagues(matched_sport_keys, selected_markets)
+    matches = fetch_odds_for_leagues(matched_sport_keys, selected_markets, fetch_filter)
     return matches
 
 if __name__ == "__main__":
@@ -1,9 +1,12 @@
 """Database models and initialization"""
-from sqlalchemy import create_engine, Column, String, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Index, UniqueConstraint
+from sqlalchemy.engine import make_url, Engine
 from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
+from typing import Dict, Optional
 import logging
-from config.settings import DATABASE_URL   
+from config.settings import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE
+from .migrations import run_migrations
 
 logger = logging.getLogger(__name__)
 Base = declarative_base()
@@ -26,15 +29,148 @@ class Odd(Base):
     draw_odds = Column(Float, nullable=False)
     away_odds = Column(Float, nullable=False)
 
+class OddsObservation(Base):
+    """One bookmaker price for one outcome at one point in time"""
+    __tablename__ = 'odds_history'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    match_id = Column(String(36), ForeignKey('matches.id', ondelete='CASCADE'), nullable=False)
+    bookmaker = Column(String(50), nullable=False)
+    market = Column(String(20), nullable=False)
+    outcome = Column(String(50), nullable=False)
+    price = Column(Float, nullable=False)
+    observed_at = Column(DateTime, nullable=False)
+    __table_args__ = (
+        # Re-ingesting the same snapshot is a no-op
+        UniqueConstraint('match_id', 'bookmaker', 'market', 'outcome', 'observed_at', name='uq_odds_history_observation'),
+        # Price movement of one outcome: WHERE match_id, market, outcome ORDER BY observed_at
+        Index('ix_odds_history_movement', 'match_id', 'market', 'outcome', 'observed_at'),
+        # Snapshot windows across matches: WHERE observed_at BETWEEN ...
+        Index('ix_odds_history_observed_at', 'observed_at'),
+    )
+
+class LatestOdd(Base):
+    """Latest price per (match, bookmaker, market, outcome), maintained on ingest"""
+    __tablename__ = 'latest_odds'
+    match_id = Column(String(36), ForeignKey('matches.id', ondelete='CASCADE'), primary_key=True)
+    market = Column(String(20), primary_key=True)
+    outcome = Column(String(50), primary_key=True)
+    bookmaker = Column(String(50), primary_key=True)
+    price = Column(Float, nullable=False)
+    observed_at = Column(DateTime, nullable=False)
+
+class DataVersion(Base):
+    """Single-row counter bumped by every odds write, in the same transaction"""
+    __tablename__ = 'data_version'
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+# Backend -> async driver used by the async engine
+ASYNC_DRIVERS = {
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+    'mysql': 'aiomysql'
+}
+
+def async_url(url: str) -> str:
+    """Rewrite a sync database URL to its async driver (sqlite:// -> sqlite+aiosqlite://)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for backend: {backend}")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+# Applied to every new SQLite connection. WAL lets readers run alongside the
+# single writer; NORMAL sync is durable across app crashes in WAL mode.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,        # KiB (negative), about 64 MB of page cache
+    'mmap_size': 268435456,      # 256 MB memory-mapped reads
+    'busy_timeout': 30000,       # ms to wait on the write lock instead of failing
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON'         # Enforces ON DELETE CASCADE
+}
+
+def _is_file_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == 'sqlite' and parsed.database not in (None, '', ':memory:')
+
+def engine_options(url: str) -> Dict:
+    """
+    Pool settings per backend. SQLite serializes writers on one file, so
+    the pool only needs room for concurrent readers and one writer; server
+    databases get a bounded, health-checked pool sized from settings.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == 'sqlite':
+        if not _is_file_sqlite(url):
+            return {}  # In-memory databases keep SQLAlchemy's single-connection default
+        return {'pool_size': 8, 'max_overflow': 0, 'pool_timeout': 30}
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': True,
+        'pool_use_lifo': True  # Lets idle connections age out past pool_recycle
+    }
+
+def apply_sqlite_profile(engine: Engine, pragmas: Optional[Dict] = None):
+    """Run the SQLite PRAGMA profile on every connection the engine opens"""
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def create_db_engine(url: str, tuned: bool = True) -> Engine:
+    """Sync engine with backend-specific pooling and, for SQLite files, the PRAGMA profile"""
+    if not tuned:
+        return create_engine(url)
+    engine = create_engine(url, **engine_options(url))
+    if _is_file_sqlite(url):
+        apply_sqlite_profile(engine)
+    return engine
+
 def init_db():
     """Initialize database connection pool"""
     try:
-        engine = create_engine(DATABASE_URL, pool_size=10, max_overflow=20)
+        engine = create_db_engine(DATABASE_URL)
         Base.metadata.create_all(engine)
+        run_migrations(engine)
         return scoped_session(sessionmaker(bind=engine, autocommit=False))
     except SQLAlchemyError as e:
         logger.critical(f"Database initialization failed: {str(e)}")
         raise
 
+_async_session_factory = None
+
+def init_async_db(url: Optional[str] = None):
+    """
+    Async engine and session factory for use inside the event loop.
+    Created on first use so the async driver is only required by callers
+    that need it; tables are created by init_db.
+    """
+    global _async_session_factory
+    if _async_session_factory is not None and url is None:
+        return _async_session_factory
+
+    url = url or DATABASE_URL
+    try:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        engine = create_async_engine(async_url(url), **engine_options(url))
+        if _is_file_sqlite(url):
+            apply_sqlite_profile(engine.sync_engine)
+        factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    except (SQLAlchemyError, ImportError) as e:
+        logger.critical(f"Async database initialization failed: {str(e)}")
+        raise
+    if url == DATABASE_URL:
+        _async_session_factory = factory
+    return factory
+
 # Initialize the database session factory
 Session = init_db()
\ No newline at end of file
@@ -1,16 +1,48 @@
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 from sqlalchemy.exc import SQLAlchemyError
-from typing import Iterator
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, AsyncIterator, List, Dict, Tuple, Sequence, Optional
 import logging
-from sqlalchemy import text
+from sqlalchemy import select, insert, update, bindparam, DateTime
+from sqlalchemy.dialects import sqlite, postgresql, mysql
+from .database import Match, Odd, OddsObservation, LatestOdd, DataVersion
 
 logger = logging.getLogger(__name__)
 
+MATCH_FIELDS = ('id', 'league', 'home_team', 'away_team', 'match_date', 'is_cup')
+ODD_FIELDS = ('home_odds', 'draw_odds', 'away_odds')
+OBSERVATION_KEY = ('match_id', 'bookmaker', 'market', 'outcome', 'observed_at')
+LATEST_KEY = ('match_id', 'market', 'outcome', 'bookmaker')
+DATA_VERSION_BUMP = update(DataVersion).where(DataVersion.id == 1).values(version=DataVersion.version + 1)
+
+# Bound window instead of DATE('now') so the match_date index is used on every backend
+MATCHES_WITH_ODDS_QUERY = (
+    select(Match.id, Match.league, Odd.home_odds, Match.match_date, Match.is_cup)
+    .join(Odd, Match.id == Odd.match_id)
+    .where(Match.match_date >= bindparam('start', type_=DateTime))
+    .where(Match.match_date <= bindparam('end', type_=DateTime))
+    .order_by(Match.match_date.asc())
+)
+
+def date_window(days_ahead: int) -> Dict[str, datetime]:
+    """[today 00:00 UTC, today + days_ahead 00:00 UTC], matching the old DATE('now') bounds"""
+    start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    return {'start': start, 'end': start + timedelta(days=days_ahead)}
+
 class DatabaseManager:
     """Handles database operations with proper session management"""
     
-    def __init__(self, session_factory):
+    def __init__(self, session_factory, async_session_factory=None):
         self.session_factory = session_factory
+        self._async_session_factory = async_session_factory
+
+    @property
+    def async_session_factory(self):
+        """Async factory, created from DATABASE_URL on first use when not injected"""
+        if self._async_session_factory is None:
+            from .database import init_async_db
+            self._async_session_factory = init_async_db()
+        return self._async_session_factory
 
     @contextmanager
     def session_scope(self) -> Iterator[None]:
@@ -26,24 +58,183 @@ class DatabaseManager:
         finally:
             session.close()
 
+    @asynccontextmanager
+    async def async_session_scope(self) -> AsyncIterator[None]:
+        """Async transactional scope; never blocks the event loop on I/O"""
+        session = self.async_session_factory()
+        try:
+            yield session
+            await session.commit()
+        except SQLAlchemyError as e:
+            logger.error(f"Database error: {str(e)}")
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+    def get_data_version(self) -> Optional[int]:
+        """
+        Counter bumped inside every odds write transaction, shared by every
+        process on the database; lets readers cache query results.
+        None when it cannot be read, so callers skip caching.
+        """
+        try:
+            with self.session_scope() as session:
+                return session.scalar(select(DataVersion.version).where(DataVersion.id == 1))
+        except SQLAlchemyError as e:
+            logger.error(f"Query failed: {str(e)}")
+            return None
+
     def get_matches_with_odds(self, days_ahead: int = 3) -> list[dict]:
-        """Safe parameterized query for SQLite"""
-        query = text("""
-            SELECT m.id, m.league, o.home_odds, m.match_date, m.is_cup
-            FROM matches m
-            JOIN odds o ON m.id = o.match_id
-            WHERE m.match_date >= DATE('now')
-            AND m.match_date <= DATE('now', :days_offset)
-            ORDER BY m.match_date ASC
-        """)
-        
+        """Matches in the date window with their summary odds"""
         try:
             with self.session_scope() as session:
-                result = session.execute(
-                    query, 
-                    {'days_offset': f'+{days_ahead} days'}
-                )
+                result = session.execute(MATCHES_WITH_ODDS_QUERY, date_window(days_ahead))
                 return [dict(row._mapping) for row in result]
         except SQLAlchemyError as e:
             logger.error(f"Query failed: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+
+    def stream_matches_with_odds(self, days_ahead: int = 3, chunk_size: int = 500) -> Iterator[List[Dict]]:
+        """
+        Same rows as get_matches_with_odds, fetched through a yield_per cursor
+        and handed out in chunks so memory stays flat as the table grows.
+        Errors are logged and re-raised: a consumer must not mistake a failed
+        or interrupted stream for a complete (possibly empty) result.
+        """
+        query = MATCHES_WITH_ODDS_QUERY.execution_options(yield_per=chunk_size)
+        try:
+            with self.session_scope() as session:
+                for partition in session.execute(query, date_window(days_ahead)).partitions():
+                    yield [dict(row._mapping) for row in partition]
+        except SQLAlchemyError as e:
+            logger.error(f"Query failed: {str(e)}")
+            raise
+
+    async def get_matches_with_odds_async(self, days_ahead: int = 3) -> list[dict]:
+        """Async variant of get_matches_with_odds for use from handlers"""
+        try:
+            async with self.async_session_scope() as session:
+                result = await session.execute(MATCHES_WITH_ODDS_QUERY, date_window(days_ahead))
+                return [dict(row._mapping) for row in result]
+        except SQLAlchemyError as e:
+            logger.error(f"Query failed: {str(e)}")
+            return []
+
+    def save_matches_with_odds(self, rows: List[Dict]) -> int:
+        """
+        Bulk upsert matches and their odds in one transaction.
+        Each row carries the match columns plus home_odds, draw_odds and away_odds,
+        and optionally 'observations': per-bookmaker prices appended to the
+        history and folded into latest_odds.
+        Returns the number of matches written.
+        """
+        match_rows, odd_rows, observations = self._split_rows(rows)
+        if not match_rows:
+            return 0
+        with self.session_scope() as session:
+            for stmt, params in self._write_plan(session.get_bind().dialect.name, match_rows, odd_rows, observations):
+                session.execute(stmt, params)
+        return len(match_rows)
+
+    async def save_matches_with_odds_async(self, rows: List[Dict]) -> int:
+        """Async variant of save_matches_with_odds"""
+        match_rows, odd_rows, observations = self._split_rows(rows)
+        if not match_rows:
+            return 0
+        async with self.async_session_scope() as session:
+            for stmt, params in self._write_plan(session.bind.dialect.name, match_rows, odd_rows, observations):
+                await session.execute(stmt, params)
+        return len(match_rows)
+
+    def get_latest_odds(self, match_ids: Sequence[str], market: str = 'h2h') -> List[Dict]:
+        """Current per-bookmaker prices for the given matches, served by the latest_odds primary key"""
+        if not match_ids:
+            return []
+        query = (
+            select(LatestOdd)
+            .where(LatestOdd.match_id.in_(list(match_ids)), LatestOdd.market == market)
+            .order_by(LatestOdd.match_id, LatestOdd.outcome, LatestOdd.price.desc())
+        )
+        try:
+            with self.session_scope() as session:
+                return [
+                    {c.name: getattr(row, c.name) for c in LatestOdd.__table__.columns}
+                    for row in session.scalars(query)
+                ]
+        except SQLAlchemyError as e:
+            logger.error(f"Query failed: {str(e)}")
+            return []
+
+    def get_odds_history(self, match_id: str, market: str, outcome: str,
+                         since: Optional[datetime] = None) -> List[Dict]:
+        """Price movement of one outcome across bookmakers, oldest first"""
+        query = (
+            select(OddsObservation.bookmaker, OddsObservation.price, OddsObservation.observed_at)
+            .where(OddsObservation.match_id == match_id,
+                   OddsObservation.market == market,
+                   OddsObservation.outcome == outcome)
+            .order_by(OddsObservation.observed_at.asc())
+        )
+        if since is not None:
+            query = query.where(OddsObservation.observed_at >= since)
+        try:
+            with self.session_scope() as session:
+                return [dict(row._mapping) for row in session.execute(query)]
+        except SQLAlchemyError as e:
+            logger.error(f"Query failed: {str(e)}")
+            return []
+
+    def _write_plan(self, dialect: str, match_rows: List[Dict], odd_rows: List[Dict],
+                    observations: List[Dict]) -> List[Tuple]:
+        """(statement, executemany params) in foreign-key order, ending with the data version bump"""
+        plan = [
+            (self._upsert(dialect, Match, ('id',)), match_rows),
+            (self._upsert(dialect, Odd, ('match_id',)), odd_rows)
+        ]
+        if observations:
+            plan.append((self._insert_ignore(dialect, OddsObservation, OBSERVATION_KEY), observations))
+            plan.append((self._upsert(dialect, LatestOdd, LATEST_KEY, only_newer=True), observations))
+        plan.append((DATA_VERSION_BUMP, {}))
+        return plan
+
+    def _upsert(self, dialect: str, model, keys: Sequence[str], only_newer: bool = False):
+        """
+        Executemany-friendly insert that overwrites existing rows by key.
+        With only_newer, rows never replace a later observed_at (MySQL
+        overwrites unconditionally). Dialects without an upsert clause
+        fall back to a plain insert.
+        """
+        columns = [c.name for c in model.__table__.columns if c.name not in keys]
+        if dialect in ('sqlite', 'postgresql'):
+            stmt = (sqlite if dialect == 'sqlite' else postgresql).insert(model)
+            return stmt.on_conflict_do_update(
+                index_elements=list(keys),
+                set_={c: stmt.excluded[c] for c in columns},
+                where=(model.observed_at <= stmt.excluded.observed_at) if only_newer else None
+            )
+        if dialect in ('mysql', 'mariadb'):
+            stmt = mysql.insert(model)
+            return stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in columns})
+        logger.warning(f"No upsert support for {dialect}, using plain inserts")
+        return insert(model)
+
+    def _insert_ignore(self, dialect: str, model, keys: Sequence[str]):
+        """Executemany-friendly insert that skips rows already present"""
+        if dialect in ('sqlite', 'postgresql'):
+            stmt = (sqlite if dialect == 'sqlite' else postgresql).insert(model)
+            return stmt.on_conflict_do_nothing(index_elements=list(keys))
+        if dialect in ('mysql', 'mariadb'):
+            return mysql.insert(model).prefix_with('IGNORE')
+        return insert(model)
+
+    def _split_rows(self, rows: List[Dict]) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+        """Split flat rows into executemany parameter lists for every table"""
+        match_rows = [{field: row[field] for field in MATCH_FIELDS if field in row} for row in rows]
+        odd_rows = [{'match_id': row['id'], **{field: row[field] for field in ODD_FIELDS}} for row in rows]
+        observations = [
+            {'match_id': row['id'], **obs}
+            for row in rows
+            for obs in row.get('observations', ())
+        ]
+        return match_rows, odd_rows, observations
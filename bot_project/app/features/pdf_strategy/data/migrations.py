@@ -0,0 +1,78 @@
+"""Ordered schema migrations for existing databases"""
+import logging
+from datetime import datetime, timezone
+from typing import Callable, List, Tuple
+from sqlalchemy import Table, Column, Integer, String, DateTime, MetaData, select, insert, inspect
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+_version_metadata = MetaData()
+schema_version = Table(
+    'schema_version', _version_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+def _backfill_odds_history(conn: Connection):
+    """Seed history and latest tables from single-row odds written before history existed"""
+    from .database import Odd, OddsObservation, LatestOdd
+    observed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    rows = [
+        {'match_id': r.match_id, 'bookmaker': 'legacy', 'market': 'h2h',
+         'outcome': outcome, 'price': price, 'observed_at': observed_at}
+        for r in conn.execute(select(Odd))
+        for outcome, price in (('home', r.home_odds), ('draw', r.draw_odds), ('away', r.away_odds))
+    ]
+    if rows:
+        conn.execute(insert(OddsObservation), rows)
+        conn.execute(insert(LatestOdd), rows)
+    logger.info(f"Backfilled {len(rows)} legacy odds observations")
+
+def _seed_data_version(conn: Connection):
+    """Create the counter row that odds writes increment"""
+    from .database import DataVersion
+    if conn.execute(select(DataVersion.id).where(DataVersion.id == 1)).first() is None:
+        conn.execute(insert(DataVersion).values(id=1, version=0))
+
+def _ensure_indexes(conn: Connection):
+    """Create model indexes missing from tables that predate them"""
+    from .database import Base
+    existing = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        names = {ix['name'] for ix in existing.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in names:
+                index.create(conn)
+                logger.info(f"Created index {index.name}")
+
+# (version, description, upgrade); append only, never renumber
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, 'odds history and latest odds', _backfill_odds_history),
+    (2, 'indexes for date-window and latest-price queries', _ensure_indexes),
+    (3, 'data version counter', _seed_data_version),
+]
+
+def run_migrations(engine: Engine) -> int:
+    """
+    Apply pending migrations in order, each in its own transaction.
+    New tables are created by create_all beforehand; migrations move data
+    and alter what create_all leaves untouched. Returns the schema version.
+    """
+    _version_metadata.create_all(engine)
+    with engine.connect() as conn:
+        applied = {v for (v,) in conn.execute(select(schema_version.c.version))}
+
+    for version, description, upgrade in MIGRATIONS:
+        if version in applied:
+            continue
+        with engine.begin() as conn:
+            upgrade(conn)
+            conn.execute(insert(schema_version).values(
+                version=version,
+                description=description,
+                applied_at=datetime.now(timezone.utc).replace(tzinfo=None)
+            ))
+        logger.info(f"Applied migration {version}: {description}")
+    return max([v for v, _, _ in MIGRATIONS], default=0)
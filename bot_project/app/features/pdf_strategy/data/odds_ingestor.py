@@ -0,0 +1,103 @@
+"""Bulk ingestion of fetched odds snapshots into the matches/odds tables"""
+import logging
+import numpy as np
+from datetime import datetime, timezone
+from typing import List, Dict, Sequence, Iterator, Optional
+from app.features.pdf_strategy.core.odds_extractor import extract_odds_batch
+
+logger = logging.getLogger(__name__)
+
+def _parse_time(value) -> Optional[datetime]:
+    """Odds API ISO timestamp ('...Z') to an aware datetime, None when absent or malformed"""
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+class OddsIngestor:
+    """
+    Turns raw Odds API events into match/odds rows and upserts them
+    through DatabaseManager, one transaction per batch.
+    """
+
+    def __init__(self, db_manager, bookmaker_chain: Sequence[str], batch_size: int = 5000):
+        self.db = db_manager
+        self.bookmaker_chain = list(bookmaker_chain)
+        self.batch_size = batch_size
+
+    def snapshot_rows(self, raw_matches: List[Dict], fetched_at: datetime) -> List[Dict]:
+        """
+        Flat match + h2h odds rows for every event with a complete 1X2 price.
+        Each row also carries the per-bookmaker observations of every market;
+        bookmakers without a last_update are stamped with fetched_at, when the
+        caller fetched the snapshot, so ingesting it again adds no history rows.
+        """
+        batch = extract_odds_batch(raw_matches, self.bookmaker_chain)
+        prices = batch['prices']
+        complete = (prices['home'] > 1.0) & (prices['away'] > 1.0) & (prices['draw'] > 1.0)
+
+        rows = []
+        for i in np.flatnonzero(complete):
+            match = batch['matches'][i]
+            match_date = _parse_time(match['commence_time'])
+            if match_date is None:
+                logger.warning(f"Skipping match {match['id']}: bad commence_time {match['commence_time']}")
+                continue
+            league = match.get('sport_title') or match.get('sport_key', 'Unknown')
+            rows.append({
+                'id': match['id'],
+                'league': league[:50],
+                'home_team': match['home_team'][:100],
+                'away_team': match['away_team'][:100],
+                'match_date': match_date.astimezone(timezone.utc).replace(tzinfo=None),  # Stored as naive UTC
+                'is_cup': 'cup' in f"{match.get('sport_key', '')} {league}".lower(),
+                'home_odds': float(prices['home'][i]),
+                'draw_odds': float(prices['draw'][i]),
+                'away_odds': float(prices['away'][i]),
+                'observations': self._observations(match, fetched_at)
+            })
+        return rows
+
+    def _observations(self, match: Dict, fetched_at: datetime) -> List[Dict]:
+        """One row per (bookmaker, market, outcome) with normalized outcome names"""
+        teams = {match['home_team'].lower(): 'home', match['away_team'].lower(): 'away'}
+        rows = []
+        for bookmaker in match['bookmakers']:
+            stamp = (_parse_time(bookmaker.get('last_update')) or fetched_at).astimezone(timezone.utc).replace(tzinfo=None)
+            key = bookmaker.get('key', 'unknown')[:50]
+            for market in bookmaker.get('markets', []):
+                for outcome in market.get('outcomes', []):
+                    name = outcome.get('name', '').lower()
+                    name = teams.get(name, name)
+                    if outcome.get('point') is not None:
+                        name = f"{name}_{outcome['point']}"
+                    rows.append({
+                        'bookmaker': key,
+                        'market': market['key'][:20],
+                        'outcome': name[:50],
+                        'price': float(outcome['price']),
+                        'observed_at': stamp
+                    })
+        return rows
+
+    def ingest(self, raw_matches: List[Dict], fetched_at: datetime) -> int:
+        """Upsert a snapshot fetched at fetched_at; returns the number of matches written"""
+        written = 0
+        for chunk in self._chunks(self.snapshot_rows(raw_matches, fetched_at)):
+            written += self.db.save_matches_with_odds(chunk)
+        logger.info(f"Ingested {written} of {len(raw_matches)} fetched matches")
+        return written
+
+    async def ingest_async(self, raw_matches: List[Dict], fetched_at: datetime) -> int:
+        """Async variant of ingest for callers on the event loop"""
+        written = 0
+        for chunk in self._chunks(self.snapshot_rows(raw_matches, fetched_at)):
+            written += await self.db.save_matches_with_odds_async(chunk)
+        logger.info(f"Ingested {written} of {len(raw_matches)} fetched matches")
+        return written
+
+    def _chunks(self, rows: List[Dict]) -> Iterator[List[Dict]]:
+        """Fixed-size batches, each written in its own transaction"""
+        for start in range(0, len(rows), self.batch_size):
+            yield rows[start:start + self.batch_size]
@@ -1,13 +1,21 @@
 # app/features/pdf_strategy/data/pdf_strategy_engine.py
 import logging
-from datetime import datetime
-from typing import List, Dict, Optional, Set
-from utils.cache import SimpleCache
+import threading
+import time
+import numpy as np
+from datetime import datetime, timezone, date, timedelta
+from typing import List, Dict, Optional, Set, Iterable, FrozenSet
+from utils.cache import LRUCache
 from config.settings import SCRAPING_API_KEY, SCRAPING_BASE_URL
 from app.features.pdf_strategy.rules.odds_decoder import PDFOddsDecoder
+from app.features.pdf_strategy.core.odds_extractor import extract_odds_batch
+from app.features.odds_fetcher import day_window
+from app.features.pdf_strategy.data.odds_ingestor import OddsIngestor
 
 logger = logging.getLogger(__name__)
 
+EMPTY_RESULTS_TTL = 300  # Seconds before a day with no results is recomputed
+
 LEAGUE_PREFERENCE = {
     # International Competitions
     "FIFA World Cup": "soccer_fifa_world_cup",
@@ -81,164 +89,247 @@ LEAGUE_PREFERENCE = {
 }
 
 class PdfStrategyEngine:
-    def __init__(self, api_timeout: int = 25):
+    def __init__(self, api_timeout: int = 25, refresh_interval: int = 1800, db_manager=None):
         logger.info("Initializing PdfStrategyEngine")
         self.api_base = SCRAPING_BASE_URL.rstrip('/')
         self.api_key = SCRAPING_API_KEY
-        self.cache = SimpleCache(ttl=330)  # 5.5 minutes
+        self.cache = LRUCache(max_entries=64, ttl=26 * 3600, name='pdf-results')  # Day results; keys carry the date
         self.timeout = api_timeout
+        self.refresh_interval = refresh_interval
         self.target_bookmaker = "bet365"
+        self.bookmaker_chain = [self.target_bookmaker, "pinnacle", "williamhill", "unibet"]  # Fallback order
+        # Data subset this strategy needs; pushed upstream as query filters
+        self.fetch_filter = {'bookmakers': self.bookmaker_chain}
         self.odds_decoder = PDFOddsDecoder()
-        self.current_date = datetime.utcnow().date()
+        # Fetched snapshots are persisted when a database is available
+        self.ingestor = OddsIngestor(db_manager, self.bookmaker_chain) if db_manager else None
         self.min_confidence = 0.75
         self.max_parlay_combinations = 5
         self.league_preference = LEAGUE_PREFERENCE
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
         logger.debug(f"Engine initialized: date={self.current_date}, timeout={self.timeout}")
 
+    @property
+    def current_date(self) -> date:
+        """Today in UTC, so cached results roll over at midnight UTC"""
+        return datetime.now(timezone.utc).date()
+
+    def get_results(self, selected_markets: Iterable[str]) -> Dict:
+        """
+        Shared read-through access to today's results for a market set.
+        Returns: {date, markets, results, updated_at, fresh_until, stale}
+        Results are keyed by (UTC date, market set), so they roll over at
+        midnight UTC. Past fresh_until (refresh_interval, EMPTY_RESULTS_TTL
+        for an empty day) today's result is served with stale=True while a
+        background refresh runs. Right after midnight, while only yesterday's
+        result exists, an empty stale entry is served instead of matches
+        that have already kicked off.
+        """
+        markets = frozenset(selected_markets)
+        today = self.current_date
+        entry = self.cache.get(self._results_key(today, markets))
+        if entry is None:
+            if self._results_key(today - timedelta(days=1), markets) not in self.cache:
+                return self.refresh(markets)
+            self._refresh_in_background(markets)
+            return {**self._empty_entry(today, markets), 'stale': True}
+        if datetime.now(timezone.utc) >= entry['fresh_until']:
+            self._refresh_in_background(markets)
+            return {**entry, 'stale': True}
+        return entry
+
+    def refresh(self, selected_markets: Iterable[str]) -> Dict:
+        """
+        Recompute results for a market set; concurrent callers share one run.
+        A failed run is not cached: the previous result (or an empty placeholder)
+        is returned and the next read tries again.
+        """
+        markets = frozenset(selected_markets)
+        today = self.current_date
+        key = self._results_key(today, markets)
+
+        with self._lock:
+            event = self._inflight.get(key)
+            owner = event is None
+            if owner:
+                event = self._inflight[key] = threading.Event()
+
+        if not owner:
+            event.wait()
+            return self.cache.get(key) or self._empty_entry(today, markets)
+
+        try:
+            try:
+                results = self._run_workflow(set(markets))
+            except Exception as e:
+                logger.error(f"Refresh failed for {sorted(markets)}, keeping previous results: {str(e)}", exc_info=True)
+                previous = self.cache.get(key)
+                return {**previous, 'stale': True} if previous else self._empty_entry(today, markets)
+
+            now = datetime.now(timezone.utc)
+            fresh_for = self.refresh_interval if results else EMPTY_RESULTS_TTL
+            entry = {
+                'date': today,
+                'markets': markets,
+                'results': results,
+                'updated_at': now,
+                'fresh_until': now + timedelta(seconds=fresh_for),
+                'stale': False
+            }
+            self.cache.set(key, entry)
+            return entry
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            event.set()
+
+    def start_precompute(self, market_sets: Iterable[Iterable[str]]):
+        """
+        Refresh the given market sets now, then every refresh_interval seconds
+        and right after midnight UTC, from one long-lived thread.
+        """
+        market_sets = [frozenset(m) for m in market_sets]
+
+        def run():
+            while True:
+                for markets in market_sets:
+                    try:
+                        self.refresh(markets)
+                    except Exception as e:
+                        logger.error(f"Scheduled refresh failed for {sorted(markets)}: {str(e)}")
+                time.sleep(self._precompute_delay())
+
+        thread = threading.Thread(target=run, name="pdf-precompute", daemon=True)
+        thread.start()
+        logger.info(f"Precomputing {len(market_sets)} market sets every {self.refresh_interval}s")
+
+    def _precompute_delay(self) -> float:
+        """Seconds until the next scheduled refresh: refresh_interval, or just past midnight UTC if sooner"""
+        now = datetime.now(timezone.utc)
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), timezone.utc)
+        return min(self.refresh_interval, (midnight - now).total_seconds() + 1)
+
+    def _refresh_in_background(self, markets: FrozenSet[str]):
+        """Start a refresh unless one is already running for today's key"""
+        with self._lock:
+            if self._results_key(self.current_date, markets) in self._inflight:
+                return
+        threading.Thread(target=self.refresh, args=(markets,), daemon=True).start()
+
+    def _results_key(self, day: date, markets: FrozenSet[str]) -> str:
+        """Cache key for one (date, market set)"""
+        return f"pdf:{day.isoformat()}:{','.join(sorted(markets))}"
+
+    def _empty_entry(self, day: date, markets: FrozenSet[str]) -> Dict:
+        """Placeholder when a shared refresh produced nothing"""
+        return {'date': day, 'markets': markets, 'results': [], 'updated_at': None,
+                'fresh_until': None, 'stale': False}
+
     def execute_full_workflow(self, selected_markets: Set[str]) -> List[Dict]:
         """Execute workflow with user-selected markets for today."""
-        logger.info(f"Starting full workflow with markets: {selected_markets}")
         try:
-            today_matches = self._fetch_today_matches(selected_markets)
-            if not today_matches:
-                logger.warning("No matches available for today")
-                return []
-            processed_matches = self._process_and_analyze_matches(today_matches)
-            logger.info("Workflow completed successfully")
-            return processed_matches
+            return self._run_workflow(selected_markets)
         except Exception as e:
             logger.critical(f"Workflow failure: {str(e)}", exc_info=True)
             return []
 
+    def _run_workflow(self, selected_markets: Set[str]) -> List[Dict]:
+        """Workflow body; fetch and processing errors propagate so they are never cached"""
+        logger.info(f"Starting full workflow with markets: {selected_markets}")
+        fetched_at = datetime.now(timezone.utc)
+        today_matches = self._fetch_today_matches(selected_markets)
+        if not today_matches:
+            logger.warning("No matches available for today")
+            return []
+        self._ingest_snapshot(today_matches, fetched_at)
+        processed_matches = self._process_and_analyze_matches(today_matches, selected_markets)
+        logger.info("Workflow completed successfully")
+        return processed_matches
+
     def _fetch_today_matches(self, selected_markets: Set[str]) -> List[Dict]:
         """Fetch matches for today using API-Football and The Odds API."""
         today = self.current_date.strftime("%Y-%m-%d")
         logger.info(f"Fetching matches for today: {today}")
         from app.features.pdf_strategy.data.competition_fetcher import integrate_into_strategy_engine
-        all_matches = integrate_into_strategy_engine(selected_markets, today)
+        fetch_filter = {**self.fetch_filter, **day_window(today)}
+        all_matches = integrate_into_strategy_engine(selected_markets, today, fetch_filter)
         if not all_matches:
             logger.warning("No matches retrieved for today")
             return []
         logger.info(f"Total matches found for today: {len(all_matches)}")
         return all_matches
 
-    def _process_and_analyze_matches(self, raw_matches: List[Dict]) -> List[Dict]:
-        """Process fetched matches into recommendations."""
+    def _ingest_snapshot(self, raw_matches: List[Dict], fetched_at: datetime):
+        """Persist the fetched snapshot; storage failures never block recommendations"""
+        if not self.ingestor:
+            return
+        try:
+            self.ingestor.ingest(raw_matches, fetched_at)
+        except Exception as e:
+            logger.error(f"Snapshot ingestion failed: {str(e)}")
+
+    def _process_and_analyze_matches(self, raw_matches: List[Dict], selected_markets: Set[str]) -> List[Dict]:
+        """Process fetched matches into recommendations with batch extraction and decoding."""
         logger.info(f"Processing {len(raw_matches)} raw matches")
+        batch = extract_odds_batch(raw_matches, self.bookmaker_chain)
+        matches, prices = batch['matches'], batch['prices']
+        outcomes = self.odds_decoder.outcomes_for(selected_markets)
+        if not matches or not outcomes:
+            logger.warning(f"Nothing to analyze: {len(matches)} matches, markets {selected_markets}")
+            return []
+
+        # One vectorized decode per analyzed outcome column
+        season_start = (batch['months'] >= 8) & (batch['months'] <= 10)
+        decoded = {o: self.odds_decoder.analyze_batch(prices[o], season_start) for o in outcomes}
+        confidence = np.column_stack([decoded[o]['confidence'] for o in outcomes])
+        best = confidence.argmax(axis=1)
+        best_confidence = confidence[np.arange(len(matches)), best]
+        profit_scores = self._calculate_profit_scores(best_confidence, prices)
+
         processed = []
-        for match in raw_matches:
-            try:
-                logger.debug(f"Processing match: {match.get('id', 'unknown')}")
-                if not self._validate_match_structure(match):
-                    logger.warning(f"Invalid match structure: {match.get('id', 'unknown')}")
-                    continue
-                odds_data = self._extract_bookmaker_odds(match)
-                if not odds_data:
-                    logger.warning(f"No odds data for match: {match.get('id', 'unknown')}")
-                    continue
-                match_analysis = self._analyze_match(match, odds_data)
-                formatted_result = self._format_match_result(match, odds_data, match_analysis)
-                processed.append(formatted_result)
-                logger.debug(f"Processed match: {match['id']}")
-            except Exception as e:
-                logger.warning(f"Error processing match {match.get('id', 'unknown')}: {str(e)}")
-        logger.info(f"Processed {len(processed)} matches successfully")
+        for i in np.flatnonzero(best_confidence >= self.min_confidence):
+            odds = {column: float(values[i]) for column, values in prices.items()}
+            markets = {
+                o: {
+                    'prediction': decoded[o]['prediction'][i],
+                    'confidence': float(decoded[o]['confidence'][i]),
+                    'original_odds': float(decoded[o]['original_odds'][i])
+                }
+                for o in outcomes
+            }
+            analysis = self._summarize_analysis(markets)
+            processed.append(self._format_match_result(matches[i], odds, analysis, float(profit_scores[i])))
+        logger.info(f"Processed {len(matches)} matches, {len(processed)} above confidence {self.min_confidence}")
         return self._generate_strategy_recommendations(processed)
 
-    def _validate_match_structure(self, match: Dict) -> bool:
-        """Validate match structure."""
-        required_keys = {'id', 'commence_time', 'home_team', 'away_team', 'bookmakers'}
-        result = all(key in match for key in required_keys)
-        logger.debug(f"Validating match {match.get('id', 'unknown')}: {result}")
-        return result
-
-    def _extract_bookmaker_odds(self, match: Dict) -> Optional[Dict]:
-        """Extract odds, prioritizing target_bookmaker with fallback."""
-        match_id = match.get('id', 'unknown')
-        logger.debug(f"Extracting odds for match: {match_id}")
-        try:
-            bookmakers = match.get('bookmakers', [])
-            if not bookmakers:
-                logger.warning(f"No bookmakers available for match: {match_id}")
-                return None
-
-            bookmaker = next(
-                (b for b in bookmakers if b['key'].lower() == self.target_bookmaker.lower()),
-                bookmakers[0]  # Fallback to first available
-            )
-            logger.debug(f"Using bookmaker: {bookmaker['key']} for match: {match_id}")
-
-            market_data = {m['key']: {o['name'].lower(): o['price'] for o in m['outcomes']} for m in bookmaker['markets']}
-            home_team_lower = match['home_team'].lower()
-            away_team_lower = match['away_team'].lower()
-            odds = {
-                'home': market_data.get('h2h', {}).get(home_team_lower, market_data.get('h2h', {}).get('home', 0.0)),
-                'away': market_data.get('h2h', {}).get(away_team_lower, market_data.get('h2h', {}).get('away', 0.0)),
-                'draw': market_data.get('h2h', {}).get('draw', 0.0),
-                'over_2.5': market_data.get('totals', {}).get('over', 0.0),
-                'under_2.5': market_data.get('totals', {}).get('under', 0.0),
-                'btts_yes': market_data.get('btts', {}).get('yes', 0.0),
-                'btts_no': market_data.get('btts', {}).get('no', 0.0)
-            }
-            logger.debug(f"Extracted odds for {match_id}: {odds}")
-            return odds
-        except Exception as e:
-            logger.error(f"Error extracting odds for match {match_id}: {str(e)}")
-            return None
+    def _summarize_analysis(self, markets: Dict[str, Dict]) -> Dict:
+        """Promote the most confident market to the top level of the analysis"""
+        best_market = max(markets, key=lambda k: markets[k]['confidence'], default=None)
+        best = markets.get(best_market, {})
+        return {
+            'markets': markets,
+            'best_market': best_market,
+            'prediction': best.get('prediction', 'no_rule_match'),
+            'confidence': best.get('confidence', 0.0)
+        }
 
-    def _analyze_match(self, match: Dict, odds: Dict, selected_markets: Set[str]) -> Dict:
-        """Analyze match odds using odds_decoder for selected markets."""
-        match_id = match.get('id', 'unknown')
-        logger.debug(f"Analyzing match {match_id} with odds: {odds} for markets: {selected_markets}")
-        try:
-            commence_date = datetime.fromisoformat(match['commence_time'].replace('Z', '+00:00'))
-            season_period = self._determine_season_period(commence_date)
-            analysis = self.odds_decoder.analyze(
-                odds=odds,
-                season_period=season_period,
-                selected_markets=selected_markets
-            )
-            logger.debug(f"Analysis for {match_id}: {analysis}")
-            return analysis
-        except Exception as e:
-            logger.error(f"Error analyzing match {match_id}: {str(e)}")
-            return {'confidence': 0.0}
-
-    def _determine_season_period(self, match_date: datetime) -> str:
-        """Determine season period based on match date."""
-        month = match_date.month
-        if 8 <= month <= 10:
-            period = 'early'
-        elif 11 <= month <= 2:
-            period = 'mid'
-        else:
-            period = 'late'
-        logger.debug(f"Season period for {match_date}: {period}")
-        return period
-
-    def _format_match_result(self, match: Dict, odds: Dict, analysis: Dict) -> Dict:
+    def _format_match_result(self, match: Dict, odds: Dict, analysis: Dict, profit_score: float) -> Dict:
         """Format match result for recommendations."""
-        match_id = match['id']
-        logger.debug(f"Formatting result for match: {match_id}")
-        result = {
-            'match_id': match_id,
+        return {
+            'match_id': match['id'],
             'teams': f"{match['home_team']} vs {match['away_team']}",
             'league': match.get('sport_title', 'Unknown League'),
             'commence_time': match['commence_time'],
             'odds': odds,
             'analysis': analysis,
-            'profit_score': self._calculate_profit_score(analysis, odds)
+            'profit_score': profit_score
         }
-        logger.debug(f"Formatted result: {result}")
-        return result
-
-    def _calculate_profit_score(self, analysis: Dict, odds: Dict) -> float:
-        """Calculate profit score for a match."""
-        confidence = analysis.get('confidence', 0.0)
-        odds_value = (odds['home'] + odds['away'] + odds.get('over_2.5', 0.0)) / 3
-        score = (confidence * 0.65) + (odds_value * 0.35)
-        logger.debug(f"Profit score calculated: {score} (confidence={confidence}, odds_value={odds_value})")
-        return score
+
+    def _calculate_profit_scores(self, confidence: np.ndarray, prices: Dict[str, np.ndarray]) -> np.ndarray:
+        """Profit score for every match at once."""
+        odds_value = (prices['home'] + prices['away'] + prices['over_2.5']) / 3
+        return (confidence * 0.65) + (odds_value * 0.35)
 
     def _generate_strategy_recommendations(self, matches: List[Dict]) -> List[Dict]:
         """Generate strategy recommendations from processed matches."""
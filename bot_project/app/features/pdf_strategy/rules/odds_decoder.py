@@ -1,5 +1,18 @@
 """PDF odds interpretation rules with validation"""
-from typing import Dict, Set
+import bisect
+import numpy as np
+from typing import Dict, List, Set, Tuple, Optional, Union
+
+RuleTable = Dict[Tuple[float, float], Tuple[str, float]]
+
+def round_half_up(values, places: int = 2):
+    """
+    Round halves up (1.095 -> 1.10) for scalars and arrays alike, so the
+    scalar and batch paths agree on rule boundaries. Python round and
+    np.round round halves to even and disagree with each other.
+    """
+    scale = 10 ** places
+    return np.floor(np.asarray(values, dtype=float) * scale + 0.5) / scale
 
 class PDFOddsDecoder:
     RULES = {
@@ -10,55 +23,119 @@ class PDFOddsDecoder:
         (3.00, 3.39): ("ft_draw_xht", 0.80),
         (3.40, 3.60): ("high_scoring_draw", 0.70)
     }
+    SEASON_START_BOOST = 1.2
+    # Selected market -> decoded odds columns
+    MARKET_OUTCOMES = {
+        'h2h': ['home', 'away', 'draw'],
+        'totals': ['over_2.5', 'under_2.5']
+    }
+    NO_MATCH = 'no_rule_match'
+
+    def __init__(self, rules: Optional[RuleTable] = None):
+        self._compile(rules or self.RULES)
+
+    def _compile(self, rules: RuleTable):
+        """Compile rules into sorted boundary arrays, rejecting bad or overlapping intervals"""
+        ordered = sorted(rules.items())
+        for (low, high), (pred, conf) in ordered:
+            if low > high:
+                raise ValueError(f"Rule {pred} has low {low} above high {high}")
+            if not 0.0 <= conf <= 1.0:
+                raise ValueError(f"Rule {pred} confidence {conf} outside [0, 1]")
+        for ((_, prev_high), (prev, _)), ((low, _), (pred, _)) in zip(ordered, ordered[1:]):
+            if low <= prev_high:
+                raise ValueError(f"Rules {prev} and {pred} overlap at {low}")
+
+        self._lows = np.array([low for (low, _), _ in ordered])
+        self._highs = np.array([high for (_, high), _ in ordered])
+        self._predictions = np.array([pred for _, (pred, _) in ordered] + [self.NO_MATCH], dtype=object)
+        self._confidences = np.array([conf for _, (_, conf) in ordered] + [0.0])
 
     def analyze_odds(self, odds: float, is_start_of_season: bool) -> Dict:
         """Apply PDF rules with input validation"""
         try:
-            rounded = round(float(odds), 2)
+            rounded = float(round_half_up(float(odds)))
             if rounded <= 0:
                 raise ValueError("Odds must be positive")
-                
+
             return self._apply_rules(rounded, is_start_of_season)
         except (TypeError, ValueError):
             return self._error_response()
+
+    def analyze_batch(self, odds, is_start_of_season: Union[bool, np.ndarray] = False) -> Dict[str, np.ndarray]:
+        """
+        Classify a whole array of odds in one vectorized pass
+        Returns: {prediction, confidence, original_odds} arrays aligned with the input
+        """
+        rounded = round_half_up(odds)
+        idx = np.searchsorted(self._lows, rounded, side='right') - 1
+        safe_idx = np.clip(idx, 0, len(self._highs) - 1)
+        matched = (idx >= 0) & (rounded > 0) & (rounded <= self._highs[safe_idx])
+        rule_idx = np.where(matched, safe_idx, len(self._lows))
+
+        boost = np.where(is_start_of_season, self.SEASON_START_BOOST, 1.0)
+        confidence = np.minimum(round_half_up(self._confidences[rule_idx] * boost), 1.0)
+        return {
+            'prediction': self._predictions[rule_idx],
+            'confidence': confidence,
+            'original_odds': np.where(matched, rounded, 0.0)
+        }
+
     def analyze(self, odds: Dict[str, float], season_period: str, selected_markets: Set[str]) -> Dict[str, Dict]:
         """Analyze match odds for selected markets"""
         is_start_of_season = (season_period == 'early')
-        analyses = {}
-        # Analyze head-to-head markets if selected
-        if 'h2h' in selected_markets:
-            analyses['home'] = self.analyze_odds(odds.get('home', 0.0), is_start_of_season)
-            analyses['away'] = self.analyze_odds(odds.get('away', 0.0), is_start_of_season)
-            analyses['draw'] = self.analyze_odds(odds.get('draw', 0.0), is_start_of_season)
-        # Analyze totals markets if selected
-        if 'totals' in selected_markets:
-            analyses['over_2.5'] = self.analyze_odds(odds.get('over_2.5', 0.0), is_start_of_season)
-            analyses['under_2.5'] = self.analyze_odds(odds.get('under_2.5', 0.0), is_start_of_season)
-        return analyses
+        markets = self.outcomes_for(selected_markets)
+        if not markets:
+            return {}
+
+        values = []
+        for market in markets:
+            try:
+                values.append(float(odds.get(market, 0.0)))
+            except (TypeError, ValueError):
+                values.append(0.0)
+        batch = self.analyze_batch(values, is_start_of_season)
+        return {
+            market: {
+                'prediction': batch['prediction'][i],
+                'confidence': float(batch['confidence'][i]),
+                'original_odds': float(batch['original_odds'][i])
+            }
+            for i, market in enumerate(markets)
+        }
+
+    def outcomes_for(self, selected_markets: Set[str]) -> List[str]:
+        """Odds columns analyzed for the selected markets, in a stable order"""
+        return [
+            outcome
+            for market, outcomes in self.MARKET_OUTCOMES.items()
+            if market in selected_markets
+            for outcome in outcomes
+        ]
 
     def _apply_rules(self, odds: float, season_start: bool) -> Dict:
         """Match odds to known rules"""
-        for (low, high), (pred, conf) in self.RULES.items():
-            if low <= odds <= high:
-                return self._build_response(pred, conf, odds, season_start)
+        idx = bisect.bisect_right(self._lows, odds) - 1
+        if idx >= 0 and odds <= self._highs[idx]:
+            return self._build_response(self._predictions[idx], self._confidences[idx], odds, season_start)
         return self._error_response()
 
-    def _build_response(self, prediction: str, 
+    def _build_response(self, prediction: str,
                        base_conf: float,
                        odds: float,
                        season_start: bool) -> Dict:
         """Construct analysis response"""
-        confidence = base_conf * 1.2 if season_start else base_conf
+        confidence = float(base_conf) * self.SEASON_START_BOOST if season_start else float(base_conf)
         return {
             'prediction': prediction,
-            'confidence': min(round(confidence, 2), 1.0),
+            'confidence': min(float(round_half_up(confidence)), 1.0),
             'original_odds': odds
         }
 
     def _error_response(self) -> Dict:
         """Default error response"""
         return {
-            'prediction': 'no_rule_match',
+            'prediction': self.NO_MATCH,
             'confidence': 0.0,
             'original_odds': 0.0
-        }
\ No newline at end of file
+        }
@@ -1,17 +1,24 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
+
+NO_RESULTS = "❌ No actionable insights found"
 
 def format_results(processed_data: Dict[str, Any]) -> str:
     """
     Updated formatter for market-specific recommendations
     """
-    output = []
-     
+    return "\n".join(iter_sections(processed_data)) or NO_RESULTS
+
+def iter_sections(processed_data: Dict[str, Any]) -> Iterator[str]:
+    """
+    Rendered result sections one at a time, so a handler can show each as it is ready
+    """
     if 'demo' in processed_data:
-        return "\n".join([
+        yield "\n".join([
             "⚡ DEMO RESULTS ⚡",
             *[f"• {item['match']} - {item['prediction']}" 
               for item in processed_data.get('demo', [])]
         ])
+        return
     
     
     def safe_get(item, key, default="N/A"):
@@ -23,16 +30,16 @@ def format_results(processed_data: Dict[str, Any]) -> str:
     def format_odds(value: float) -> str:
         return f"{max(1, value):.2f}"
     
-    def add_section(title: str, items: List[Dict], formatter: callable):
+    def add_section(title: str, items: List[Dict], formatter: callable) -> Iterator[str]:
         if items:
-            output.append(f"\n{title}")
-            output.extend([f"• {formatter(item)}" for item in items])
+            yield "\n".join([f"\n{title}", *[f"• {formatter(item)}" for item in items]])
 
     if 'error' in processed_data:
-        return f"❌ Error: {processed_data['error']}"
+        yield f"❌ Error: {processed_data['error']}"
+        return
     
     # ARIMA Market Analysis
-    add_section(
+    yield from add_section(
         "📊 ARIMA Trend Recommendations",
         processed_data.get('arima', {}).values(),
         lambda x: (
@@ -44,7 +51,7 @@ def format_results(processed_data: Dict[str, Any]) -> str:
     )
     
     # Monte Carlo Simulations
-    add_section(
+    yield from add_section(
         "🎲 Monte Carlo Value Picks",
         processed_data.get('simulation_results', []),
         lambda x: (
@@ -56,7 +63,7 @@ def format_results(processed_data: Dict[str, Any]) -> str:
     )
     
     # Kelly Criterion (updated formatting)
-    add_section(
+    yield from add_section(
         "💰 Kelly Optimal Stakes",
         processed_data.get('recommended_parlays', []),
         lambda x: (
@@ -67,7 +74,7 @@ def format_results(processed_data: Dict[str, Any]) -> str:
     )
     
     # Arbitrage Opportunities
-    add_section(
+    yield from add_section(
         "🔍 Arbitrage Opportunities",
         processed_data.get('arbitrage_opportunities', []),
         lambda x: (
@@ -78,7 +85,7 @@ def format_results(processed_data: Dict[str, Any]) -> str:
     )
     
     # Value Bets (OCM)
-    add_section(
+    yield from add_section(
         "🔎 Value Bet Recommendations",
         processed_data.get('value_bets', []),
         lambda x: (
@@ -87,5 +94,3 @@ def format_results(processed_data: Dict[str, Any]) -> str:
             f"  📈 Odds: {format_odds(x.get('best_odds', 0))} | Value: {safe_get(x, 'value_rating')}"
         )
     )
-    
-    return "\n".join(output) if output else "❌ No actionable insights found"
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""Compact wager dump selection records and their column view"""
+import sys
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MATCH_WINNER = sys.intern('match_winner')
+
+class Selection:
+    """
+    One wager dump leg. Slots instead of a per-record dict, interned names
+    so a team or league string is stored once across every user's dump,
+    and a precomputed match key for filtering and de-duplication.
+    Supports the dict reads (s['odds'], s.get('home_team')) older code uses.
+    """
+    __slots__ = ('league', 'home_team', 'away_team', 'market', 'selection',
+                 'odds', 'team_type', 'algorithm', 'probability', 'match_key')
+    FIELDS = __slots__[:-1]
+
+    def __init__(self, league: str, home_team: str, away_team: str, market: str, selection: str,
+                 odds: float, team_type: str = 'unknown', algorithm: str = 'unknown',
+                 probability: Optional[float] = None):
+        self.league = sys.intern(str(league))
+        self.home_team = sys.intern(str(home_team))
+        self.away_team = sys.intern(str(away_team))
+        self.market = sys.intern(str(market))
+        self.selection = sys.intern(str(selection))
+        self.odds = float(odds)
+        self.team_type = sys.intern(str(team_type))
+        self.algorithm = sys.intern(str(algorithm))
+        self.probability = probability
+        self.match_key = hash((self.home_team, self.away_team))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Selection':
+        return cls(**{field: data[field] for field in cls.FIELDS if field in data})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict for JSON persistence; an unset probability is left out"""
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        if data['probability'] is None:
+            del data['probability']
+        return data
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, None) if key in self.FIELDS else None
+        return default if value is None else value
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Selection):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.FIELDS)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Selection({self.home_team} vs {self.away_team}: {self.selection} @ {self.odds:.2f})"
+
+def as_selection(item: Any) -> Selection:
+    """Selection for a record or a dict, e.g. one reloaded from the session store"""
+    return item if isinstance(item, Selection) else Selection.from_dict(item)
+
+def columns(records: List[Selection]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(odds, match keys, is match_winner) arrays aligned with records"""
+    count = len(records)
+    odds = np.fromiter((s.odds for s in records), dtype=np.float64, count=count)
+    keys = np.fromiter((s.match_key for s in records), dtype=np.int64, count=count)
+    # Equality, not identity: == still short-circuits on the interned strings
+    match_winner = np.fromiter((s.market == MATCH_WINNER for s in records), dtype=bool, count=count)
+    return odds, keys, match_winner
+
+def cheapest_per_match(odds: np.ndarray, keys: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """
+    Index of the lowest-odds candidate for every match key, earliest on ties,
+    ordered by each key's first appearance among candidates.
+    """
+    if not len(candidates):
+        return candidates
+    cand_keys = keys[candidates]
+    # Stable sort by key, then odds: the first index of each key run is its cheapest leg
+    order = candidates[np.lexsort((odds[candidates], cand_keys))]
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    _, first_seen = np.unique(cand_keys, return_index=True)  # Same key order as starts
+    return order[starts][np.argsort(first_seen, kind='stable')]
+
+def to_records(items: Iterable[Any]) -> List[Selection]:
+    return [as_selection(item) for item in items]
@@ -0,0 +1,248 @@
+"""Bounded per-user session store with persisted wager dumps"""
+import sys
+import json
+import time
+import atexit
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Session keys that survive eviction and restarts; everything else is rebuilt on demand
+PERSISTED_KEYS = ('wager_dump',)
+
+def deep_sizeof(obj: Any, _seen: Optional[set] = None) -> int:
+    """Approximate bytes held by an object graph (containers, strings, plain objects)"""
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    elif hasattr(obj, '__slots__'):
+        size += sum(deep_sizeof(getattr(obj, name, None), seen) for name in obj.__slots__)
+    return size
+
+def _encode(obj: Any) -> Any:
+    """JSON fallback for records that serialize themselves, such as wager dump selections"""
+    to_dict = getattr(obj, 'to_dict', None)
+    return to_dict() if callable(to_dict) else str(obj)
+
+class SessionStore(MutableMapping):
+    """
+    Drop-in replacement for the user_sessions dict.
+    - Sessions idle for longer than idle_ttl are evicted, and the least
+      recently used ones go first once max_sessions or max_bytes is exceeded.
+      Both checks run at most every sweep_interval seconds, during an access,
+      and only re-size sessions accessed since the previous sweep.
+    - Wager dumps are written to SQLite on eviction, on each sweep when they
+      changed (only sessions accessed since the previous sweep are checked),
+      and at exit. A user whose session is not in memory gets
+      their dump back lazily on the next access.
+    """
+
+    def __init__(self, path: str, idle_ttl: float = 3600, max_sessions: int = 5000,
+                 max_bytes: int = 64 * 1024 * 1024, sweep_interval: float = 60):
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._sessions: "OrderedDict[int, Dict]" = OrderedDict()
+        self._last_access: Dict[int, float] = {}
+        self._persisted: Dict[int, int] = {}  # user_id -> hash of the stored dump
+        self._sizes: Dict[int, int] = {}      # user_id -> deep_sizeof at the last sweep
+        self._dirty: set = set()              # Accessed since the last sweep
+        self._next_sweep = time.monotonic() + sweep_interval
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS session_dumps (user_id INTEGER PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._stored_ids = {row[0] for row in self._db.execute("SELECT user_id FROM session_dumps")}
+        atexit.register(self.close)
+
+    def __getitem__(self, user_id: int) -> Dict:
+        with self._lock:
+            self._maybe_sweep()
+            session = self._sessions.get(user_id)
+            if session is None:
+                session = self._load(user_id)
+                if session is None:
+                    raise KeyError(user_id)
+                self._sessions[user_id] = session
+                self._persisted[user_id] = self._dump_hash(session)
+                self._enforce_count()
+            self._touch(user_id)
+            return session
+
+    def __setitem__(self, user_id: int, session: Dict):
+        with self._lock:
+            self._maybe_sweep()
+            self._sessions[user_id] = session
+            self._touch(user_id)
+            self._enforce_count()
+
+    def __delitem__(self, user_id: int):
+        """Forget a session everywhere, including a stored dump not loaded into memory"""
+        with self._lock:
+            if user_id not in self._sessions and user_id not in self._stored_ids:
+                raise KeyError(user_id)
+            if user_id in self._stored_ids:
+                with self._db:
+                    self._db.execute("DELETE FROM session_dumps WHERE user_id = ?", (user_id,))
+                self._stored_ids.discard(user_id)
+            self._forget(user_id)
+
+    def __contains__(self, user_id: object) -> bool:
+        with self._lock:
+            return user_id in self._sessions or user_id in self._stored_ids
+
+    def __iter__(self) -> Iterator[int]:
+        with self._lock:
+            return iter(list(self._sessions))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def _enforce_count(self) -> int:
+        """Keep the session count within max_sessions between sweeps"""
+        overflow = len(self._sessions) - self.max_sessions
+        if overflow > 0:
+            return self._evict(list(self._sessions)[:overflow])
+        return 0
+
+    def _touch(self, user_id: int):
+        self._sessions.move_to_end(user_id)
+        self._last_access[user_id] = time.monotonic()
+        self._dirty.add(user_id)
+
+    def _load(self, user_id: int) -> Optional[Dict]:
+        """Rebuild a minimal session from the stored dump"""
+        if user_id not in self._stored_ids:
+            return None
+        row = self._db.execute("SELECT data FROM session_dumps WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+        session = json.loads(row[0])
+        logger.debug(f"Loaded stored session for user {user_id}")
+        return session
+
+    def _save(self, user_ids: List[int]):
+        """Write changed dumps of the given in-memory sessions in one transaction"""
+        rows, cleared, digests = [], [], {}
+        for user_id in user_ids:
+            session = self._sessions.get(user_id)
+            if session is None:
+                continue
+            digest = self._dump_hash(session)
+            if self._persisted.get(user_id) == digest:
+                continue
+            digests[user_id] = digest
+            data = {key: session[key] for key in PERSISTED_KEYS if session.get(key)}
+            if data:
+                rows.append((user_id, json.dumps(data, default=_encode), time.time()))
+            elif user_id in self._stored_ids:
+                cleared.append((user_id,))
+        if rows or cleared:
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO session_dumps (user_id, data, updated_at) VALUES (?, ?, ?)", rows
+                )
+                self._db.executemany("DELETE FROM session_dumps WHERE user_id = ?", cleared)
+            self._stored_ids.update(row[0] for row in rows)
+            self._stored_ids.difference_update(row[0] for row in cleared)
+        # Only once the transaction committed, so a failed write is retried next time
+        self._persisted.update(digests)
+
+    def _dump_hash(self, session: Dict) -> int:
+        return hash(json.dumps([session.get(key) for key in PERSISTED_KEYS], sort_keys=True, default=_encode))
+
+    def _evict(self, user_ids: List[int]) -> int:
+        """Persist then drop the given sessions; keeps them all if the write fails"""
+        if not user_ids:
+            return 0
+        try:
+            self._save(user_ids)
+        except sqlite3.Error as e:
+            logger.error(f"Could not persist {len(user_ids)} sessions, keeping them in memory: {str(e)}")
+            return 0
+        for user_id in user_ids:
+            self._forget(user_id)
+        return len(user_ids)
+
+    def _forget(self, user_id: int):
+        self._sessions.pop(user_id, None)
+        self._last_access.pop(user_id, None)
+        self._persisted.pop(user_id, None)
+        self._sizes.pop(user_id, None)
+        self._dirty.discard(user_id)
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            self.sweep()
+
+    def sweep(self) -> int:
+        """Persist changed dumps, evict idle sessions, then enforce the caps; returns evictions"""
+        with self._lock:
+            now = time.monotonic()
+            idle = [uid for uid, seen in self._last_access.items() if now - seen > self.idle_ttl]
+            evicted = self._evict(idle)
+            evicted += self._enforce_count()  # Least recently used first
+
+            # Untouched sessions keep their size and stored hash from earlier sweeps
+            dirty = [uid for uid in self._dirty if uid in self._sessions]
+            for uid in dirty:
+                self._sizes[uid] = deep_sizeof(self._sessions[uid])
+            total = sum(self._sizes.get(uid, 0) for uid in self._sessions)
+            victims = []
+            for uid in self._sessions:
+                if total <= self.max_bytes:
+                    break
+                victims.append(uid)
+                total -= self._sizes.get(uid, 0)
+            if self._evict(victims):
+                evicted += len(victims)
+            else:
+                total += sum(self._sizes.get(uid, 0) for uid in victims)
+
+            try:
+                self._save(dirty)
+                self._dirty.difference_update(dirty)
+            except sqlite3.Error as e:
+                logger.error(f"Could not persist sessions: {str(e)}")
+            if evicted:
+                logger.info(f"Evicted {evicted} sessions, {len(self._sessions)} in memory ({total / 1024:.0f} KiB)")
+            return evicted
+
+    def memory_report(self, top: int = 5) -> Dict[str, Any]:
+        """Session count, estimated bytes in memory and the largest sessions"""
+        with self._lock:
+            sizes = {uid: deep_sizeof(session) for uid, session in self._sessions.items()}
+        largest = sorted(sizes.items(), key=lambda x: x[1], reverse=True)[:top]
+        return {
+            'sessions': len(sizes),
+            'stored_dumps': len(self._stored_ids),
+            'total_bytes': sum(sizes.values()),
+            'largest': largest
+        }
+
+    def close(self):
+        """Persist every in-memory dump; called at exit"""
+        with self._lock:
+            try:
+                self._save(list(self._sessions))
+            except sqlite3.Error as e:
+                logger.error(f"Could not persist sessions: {str(e)}")
@@ -0,0 +1,151 @@
+"""Disk tier for preprocessed odds snapshots, addressed by content hash"""
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+import numpy as np
+from typing import BinaryIO, Callable, List, Dict, Optional, Tuple, Union
+from app.features.data_processing import ProcessedMatch, OUTCOMES
+
+logger = logging.getLogger('OddsBot')
+
+# Per-match fields stored in the JSON sidecar; prices live in the .npy file
+META_FIELDS = ('match_id', 'league', 'home_team', 'away_team', 'commence_time')
+
+class SnapshotStore:
+    """
+    Preprocessed matches saved as one (matches, bookmakers, outcomes) float
+    array (.npy, read in one call on load) plus a small JSON sidecar of names.
+    Files are named by the snapshot hash, so identical snapshots share one
+    file; index.json maps a cache key (league) to its latest hash and age.
+    """
+
+    def __init__(self, root: str, max_age: float = 900, keep: int = 3):
+        self.root = root
+        self.max_age = max_age  # Snapshots older than this are not served
+        self.keep = keep        # Snapshots kept per key
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._index_path = os.path.join(root, 'index.json')
+        self._index: Dict[str, List[Dict]] = self._read_index()
+
+    def save(self, key: str, matches: List[ProcessedMatch]) -> str:
+        """Persist a snapshot for key and return its hash"""
+        prices, meta = encode_matches(matches)
+        digest = snapshot_hash(prices, meta)
+        base = os.path.join(self.root, digest)
+        if not os.path.exists(f"{base}.npy"):
+            self._atomic_write(f"{base}.json", json.dumps(meta).encode())
+            self._atomic_write(f"{base}.npy", lambda f: np.save(f, prices))
+
+        with self._lock:
+            history = [e for e in self._index.get(key, []) if e['hash'] != digest]
+            self._index[key] = [{'hash': digest, 'saved_at': time.time()}] + history[:self.keep - 1]
+            dropped = {e['hash'] for e in history[self.keep - 1:]}
+            self._write_index()
+        self._remove_unreferenced(dropped)
+        return digest
+
+    def load(self, key: str) -> Optional[Tuple[List[ProcessedMatch], float]]:
+        """Latest snapshot for key as (matches, age in seconds), or None when missing or too old"""
+        with self._lock:
+            entries = self._index.get(key)
+        if not entries:
+            return None
+        age = time.time() - entries[0]['saved_at']
+        if age > self.max_age:
+            return None
+        matches = self.load_hash(entries[0]['hash'])
+        return (matches, age) if matches is not None else None
+
+    def load_hash(self, digest: str) -> Optional[List[ProcessedMatch]]:
+        """Snapshot by hash, or None when its files are missing or unreadable"""
+        base = os.path.join(self.root, digest)
+        try:
+            # Read whole: decode_matches converts every price anyway, so a memory map saves nothing
+            prices = np.load(f"{base}.npy")
+            with open(f"{base}.json", encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable snapshot {digest}: {str(e)}")
+            return None
+        return decode_matches(prices, meta)
+
+    def _remove_unreferenced(self, digests):
+        with self._lock:
+            live = {e['hash'] for entries in self._index.values() for e in entries}
+        for digest in set(digests) - live:
+            for ext in ('.npy', '.json'):
+                try:
+                    os.remove(os.path.join(self.root, digest + ext))
+                except FileNotFoundError:
+                    pass
+
+    def _read_index(self) -> Dict[str, List[Dict]]:
+        try:
+            with open(self._index_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self):
+        self._atomic_write(self._index_path, json.dumps(self._index).encode())
+
+    def _atomic_write(self, path: str, data: Union[bytes, Callable[[BinaryIO], None]]):
+        """
+        Write through a temp file unique to this call, then rename over path;
+        concurrent writers (threads or processes) never share a temp file.
+        data is the bytes to write or a callable that writes to the file.
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if callable(data):
+                    data(f)
+                else:
+                    f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+
+def encode_matches(matches: List[ProcessedMatch]) -> Tuple[np.ndarray, Dict]:
+    """Split matches into a raw price array (NaN where a bookmaker has no price) and name metadata"""
+    width = max((len(m.get('bookmakers', {})) for m in matches), default=0)
+    prices = np.full((len(matches), max(width, 1), len(OUTCOMES)), np.nan)
+    for i, match in enumerate(matches):
+        for j, odds in enumerate(match.get('bookmakers', {}).values()):
+            prices[i, j] = [np.nan if odds.get(o) is None else odds[o] for o in OUTCOMES]
+    meta = {
+        'matches': [{field: m.get(field) for field in META_FIELDS} for m in matches],
+        'bookmakers': [list(m.get('bookmakers', {})) for m in matches]
+    }
+    return prices, meta
+
+def decode_matches(prices: np.ndarray, meta: Dict) -> List[ProcessedMatch]:
+    """Rebuild ProcessedMatch dicts, in the shape preprocess_odds produces"""
+    values = np.asarray(prices).tolist()  # One bulk conversion instead of per-element numpy scalars
+    matches = []
+    for row, fields, bookmakers in zip(values, meta['matches'], meta['bookmakers']):
+        match = {**fields, 'bookmakers': {}, 'home_odds': [], 'away_odds': [], 'draw_odds': []}
+        for name, quote in zip(bookmakers, row):
+            match['bookmakers'][name] = {}
+            for outcome, price in zip(OUTCOMES, quote):
+                present = price == price  # NaN marks a missing price
+                match['bookmakers'][name][outcome] = price if present else None
+                if present:
+                    match[f"{outcome}_odds"].append(price)
+        matches.append(match)
+    return matches
+
+def snapshot_hash(prices: np.ndarray, meta: Dict) -> str:
+    """Content hash of an encoded snapshot"""
+    digest = hashlib.sha1(np.ascontiguousarray(prices).tobytes())
+    digest.update(json.dumps(meta, sort_keys=True).encode())
+    return digest.hexdigest()[:20]
@@ -1,11 +1,15 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 import logging
+from app.features.accumulator import SmartParlayBuilder, ParlayCombination
+from app.features.selections import Selection, as_selection
 
 logger = logging.getLogger(__name__)
 
 class WagerDumpManager:
-    def __init__(self, user_sessions: Dict):
+    def __init__(self, user_sessions: Dict, batch_size: int = 5):
         self.user_sessions = user_sessions
+        self.batch_size = batch_size
+        self.parlay_builder = SmartParlayBuilder()
 
     def add_to_dump(self, user_id: int) -> bool:
         """Add current selections to the wager dump, filtering for match_winner outcomes."""
@@ -30,16 +34,16 @@ class WagerDumpManager:
             # Check if market or selection indicates a match_winner outcome
             if market in ['home', 'away', 'draw', 'match_winner'] or selection in [home_team, away_team, 'draw']:
                 # Normalize to match_winner and ensure all fields exist
-                normalized_selection = {
-                    'league': s.get('league', 'Unknown'),
-                    'home_team': s.get('home_team', 'N/A'),
-                    'away_team': s.get('away_team', 'N/A'),
-                    'market': 'match_winner',
-                    'selection': s.get('selection', 'N/A'),
-                    'odds': float(s.get('odds', 1.0)),
-                    'team_type': s.get('team_type', 'unknown'),
-                    'algorithm': s.get('algorithm', 'unknown')
-                }
+                normalized_selection = Selection(
+                    league=s.get('league', 'Unknown'),
+                    home_team=s.get('home_team', 'N/A'),
+                    away_team=s.get('away_team', 'N/A'),
+                    market='match_winner',
+                    selection=s.get('selection', 'N/A'),
+                    odds=float(s.get('odds', 1.0)),
+                    team_type=s.get('team_type', 'unknown'),
+                    algorithm=s.get('algorithm', 'unknown')
+                )
                 match_winner_selections.append(normalized_selection)
 
         if not match_winner_selections:
@@ -69,14 +73,22 @@ class WagerDumpManager:
         logger.info(f"No selections to discard for user {user_id}")
         return False
 
-    def get_wager_dump(self, user_id: int) -> List[Dict[str, Any]]:
+    def get_wager_dump(self, user_id: int) -> List[Selection]:
         """Retrieve the wager dump for a user."""
         session = self.user_sessions.get(user_id, {})
         if not session:
             logger.warning(f"No session found for user {user_id}")
             return []
             
-        return session.get('wager_dump', [])
+        return self._dump(session)
+
+    @staticmethod
+    def _dump(session: Dict) -> List[Selection]:
+        """The session's wager dump as records; dicts reloaded from the session store are converted in place"""
+        wager_dump = session.get('wager_dump', [])
+        if any(not isinstance(s, Selection) for s in wager_dump):
+            wager_dump[:] = [as_selection(s) for s in wager_dump]
+        return wager_dump
 
     def verify_league_alg_result(self, user_id: int) -> bool:
         """Verify that league-alg-result data is stored in the dump."""
@@ -100,4 +112,40 @@ class WagerDumpManager:
         self.user_sessions[user_id] = {
             'wager_dump': wager_dump  # Preserve only wager_dump
         }
-        logger.info(f"Reset session for user {user_id}")
\ No newline at end of file
+        if 'parlay_batch' in session:
+            self.user_sessions[user_id]['parlay_batch'] = session['parlay_batch']
+        logger.info(f"Reset session for user {user_id}")
+
+    def next_parlay(self, user_id: int) -> Tuple[Optional[ParlayCombination], int, int]:
+        """
+        Page through a precomputed batch of parlays for the user's wager dump.
+        The batch is rebuilt only when the dump changes.
+        Returns: (parlay, position, batch_size); parlay is None when none fits.
+        """
+        session = self.user_sessions.get(user_id, {})
+        wager_dump = self._dump(session)
+        if not wager_dump:
+            return None, 0, 0
+
+        dump_key = self._dump_key(wager_dump)
+        batch = session.get('parlay_batch')
+        if not batch or batch['dump_key'] != dump_key:
+            batch = {
+                'dump_key': dump_key,
+                'parlays': self.parlay_builder.generate_batch(wager_dump, count=self.batch_size),
+                'cursor': 0
+            }
+            session['parlay_batch'] = batch
+            logger.info(f"Built {len(batch['parlays'])} parlays for user {user_id}")
+
+        if not batch['parlays']:
+            return None, 0, 0
+
+        position = batch['cursor'] % len(batch['parlays'])
+        batch['cursor'] = position + 1
+        return batch['parlays'][position], position + 1, len(batch['parlays'])
+
+    @staticmethod
+    def _dump_key(wager_dump: List[Selection]) -> int:
+        """Content key of a wager dump, used to invalidate the cached batch"""
+        return hash(tuple((s.match_key, s.selection, s.odds) for s in wager_dump))
\ No newline at end of file
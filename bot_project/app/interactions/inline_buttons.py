@@ -21,26 +21,18 @@ ALGORITHM_DATA = {
     'value': ('📊 Value Bets', 'Odds Comparison')
 }
 
-# Market data: key -> (display_name, api_key)
+# Market data: key -> (display_name, api_key); only markets the PDF decoder supports
 MARKET_DATA = {
-    "match_winner": ("Match Winner", "match_winner"),
-    "both_teams_to_score": ("Both Teams To Score", "both_teams_to_score"),
-    "over_under": ("Over Under", "over_under"),
-    "correct_score": ("Correct Score", "correct_score")
+    "h2h": ("Match Result (1X2)", "h2h"),
+    "totals": ("Over/Under 2.5 Goals", "totals")
 }
 
 def load_market_data() -> None:
     """Load market data from config if available, else use fallback."""
     global MARKET_DATA
     try:
-        from config.market_config import AVAILABLE_MARKETS
-        # Flatten AVAILABLE_MARKETS for button display
-        market_data_update = {
-            market: (market.replace('_', ' ').title(), market)
-            for group in AVAILABLE_MARKETS.values()
-            for market in group
-        }
-        MARKET_DATA.update(market_data_update)
+        from config.market_config import PDF_MARKETS
+        MARKET_DATA = {market: (label, market) for market, label in PDF_MARKETS.items()}
     except ImportError:
         pass  # Use hardcoded MARKET_DATA as fallback
 
@@ -0,0 +1,79 @@
+"""Throttled edits of a progress message while a result is being built"""
+import asyncio
+import logging
+import time
+from typing import Optional
+from telegram import InlineKeyboardMarkup, Message
+from telegram.error import BadRequest, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096
+EDIT_INTERVAL = 1.0  # Telegram allows about one edit per second per chat
+
+class ProgressMessage:
+    """
+    Keeps one message up to date with partial output. Intermediate updates
+    are coalesced so at most one edit goes out per `interval`; only the
+    latest text is sent. The final update is always delivered, after any
+    remaining interval and flood-control wait.
+    """
+
+    def __init__(self, message: Message, interval: float = EDIT_INTERVAL):
+        self.message = message
+        self.interval = interval
+        self._text = message.text if isinstance(message, Message) else None
+        self._last_edit = time.monotonic()  # The message was just sent or edited
+        self._pending: Optional[str] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def update(self, text: str):
+        """Show text soon; superseded by any later update before it is sent"""
+        self._pending = text
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def finish(self, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None):
+        """Send the final text, replacing anything still pending"""
+        self.cancel()
+        await self._wait_turn()
+        try:
+            await self._edit(text, reply_markup)
+        except RetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+            await self._edit(text, reply_markup)
+
+    def cancel(self):
+        """Drop any pending update, e.g. before the message is replaced with an error"""
+        self._pending = None
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+
+    async def _flush_later(self):
+        await self._wait_turn()
+        text, self._pending = self._pending, None
+        if text is None:
+            return
+        try:
+            await self._edit(text[:MAX_MESSAGE_LENGTH - 2] + " …" if len(text) > MAX_MESSAGE_LENGTH else text)
+        except RetryAfter as e:
+            logger.debug(f"Progress edit skipped, flood control for {e.retry_after}s")
+        except Exception as e:  # Progress is best effort; the final edit reports errors
+            logger.warning(f"Progress edit failed: {str(e)}")
+
+    async def _wait_turn(self):
+        delay = self._last_edit + self.interval - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _edit(self, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None):
+        if text == self._text and reply_markup is None:
+            return
+        try:
+            await self.message.edit_text(text, reply_markup=reply_markup)
+        except BadRequest as e:
+            if 'not modified' not in str(e).lower():
+                raise
+        finally:
+            self._last_edit = time.monotonic()
+        self._text = text
@@ -1,3 +1,5 @@
+import math
+import asyncio
 import logging
 import random
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
@@ -7,10 +9,18 @@ from typing import List, Dict, Any, Optional, Set
 from data.user_manager import UserManager
 from app.features.odds_fetcher import fetch_odds_for_league
 from app.features.data_processing import preprocess_odds, process_pipeline
-from app.features.result_formatter import format_results
+from app.features.result_formatter import iter_sections, NO_RESULTS
 from app.interactions.league_selection import LeagueManager
-from config.settings import BOT_TOKEN, SCRAPING_API_KEY, SCRAPING_BASE_URL
+from config.settings import (
+    BOT_TOKEN, SCRAPING_API_KEY, SCRAPING_BASE_URL,
+    SESSION_STORE_PATH, SESSION_IDLE_TTL, SESSION_MAX_COUNT, SESSION_MAX_BYTES,
+    SCHEDULER_WORKERS, SCHEDULER_RATE_PER_MINUTE, SCHEDULER_BURST, SCHEDULER_PAID_WEIGHT, SCHEDULER_MAX_QUEUE,
+    BOT_MODE, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET,
+    WEBHOOK_MAX_CONNECTIONS, WEBHOOK_DRAIN_TIMEOUT, UPDATE_CONCURRENCY
+)
+from config.market_config import PRECOMPUTED_MARKET_SETS, PDF_REFRESH_INTERVAL, PDF_MARKETS
 from utils.logger import setup_logging
+from utils.scheduler import FairScheduler
 from app.features.pdf_strategy.data.database import init_db, Session
 from app.features.pdf_strategy.data.pdf_strategy_engine import PdfStrategyEngine
 from app.features.algorithms.arima import analyze_odds_movement
@@ -20,11 +30,16 @@ from app.features.algorithms.monte_carlo import simulate_outcomes
 from app.features.algorithms.ipt import implied_probability_threshold_model
 from app.features.algorithms.ocm import odds_comparison_model
 from app.features.pdf_strategy.core.odds_processor import OddsProcessor
+from app.features.pdf_strategy.rules.odds_decoder import PDFOddsDecoder
 from app.features.pdf_strategy.core.parlay_builder import ParlayBuilder
 from app.features.pdf_strategy.data.db_connector import DatabaseManager 
+from app.features.pdf_strategy.data.odds_ingestor import OddsIngestor
 from app.features.wager_dump import WagerDumpManager
+from app.features.session_store import SessionStore
 from app.interactions.inline_buttons import get_markup 
-from app.features.accumulator import SmartParlayBuilder 
+from app.interactions.progress import ProgressMessage
+from app.update_processor import ChatOrderedUpdateProcessor
+from app.webhook import serve_webhook
 
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -34,8 +49,27 @@ class BetSageAIBot:
         self.db_manager = DatabaseManager(Session)
         self.league_manager = LeagueManager()
         self.user_manager = UserManager()
-        self.user_sessions = {}
+        self.user_sessions = SessionStore(
+            SESSION_STORE_PATH,
+            idle_ttl=SESSION_IDLE_TTL,
+            max_sessions=SESSION_MAX_COUNT,
+            max_bytes=SESSION_MAX_BYTES
+        )
         self.wager_dump_manager = WagerDumpManager(self.user_sessions)
+        self.scheduler = FairScheduler(  # Shares analysis capacity fairly between users
+            workers=SCHEDULER_WORKERS,
+            rate=SCHEDULER_RATE_PER_MINUTE / 60,
+            burst=SCHEDULER_BURST,
+            paid_weight=SCHEDULER_PAID_WEIGHT,
+            max_queue=SCHEDULER_MAX_QUEUE
+        )
+        self.pdf_engine = PdfStrategyEngine(  # Shared by all users
+            refresh_interval=PDF_REFRESH_INTERVAL,
+            db_manager=self.db_manager
+        )
+        # League snapshots fetched by handlers are stored through the async engine
+        self.odds_ingestor = OddsIngestor(self.db_manager, self.pdf_engine.bookmaker_chain)
+        self.odds_processor = OddsProcessor(self.db_manager)  # Decoded stored odds, cached by data version
 
     async def handle_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle the /start command or main menu callback"""
@@ -237,7 +271,7 @@ class BetSageAIBot:
                 reply_markup=get_markup('user_management')
             )
         elif action == 'stats':
-            await self._show_admin_stats(query)
+            await self._show_admin_stats(query, context)
         elif action in ['verify', 'block', 'unblock']:
             context.user_data['admin_action'] = action
             await query.edit_message_text(
@@ -326,28 +360,58 @@ class BetSageAIBot:
         if not league_key:
             return await self.show_error(query, "No league selected")
         
+        ticket = self.scheduler.submit(
+            user_id,
+            ('algo', league_key, algorithm),
+            lambda: self._run_algorithm(query, user_id, league_key, algorithm),
+            paid=self.user_manager.is_paid(user_id)
+        )
+        await self._report_ticket(query, ticket)
+
+    async def _run_algorithm(self, query, user_id: int, league_key: str, algorithm: str):
+        """Run the analysis pipeline for one user; scheduled by handle_algorithm_selection"""
+        progress = None
         try:
             api_league_key = self.league_manager.get_api_key(league_key)
             if not api_league_key:
                 raise ValueError("Invalid league mapping")
             
-            progress_msg = await query.edit_message_text(
-                f"⚙️ Processing {self.league_manager.get_display_name(league_key)}...\nAlgorithm: {algorithm.upper()}"
-            )
+            display_name = self.league_manager.get_display_name(league_key)
+            header = f"⚙️ Processing {display_name}...\nAlgorithm: {algorithm.upper()}"
+            progress = ProgressMessage(await query.edit_message_text(header))
+            stages = []
+            
+            async def on_stage(stage, info):
+                if stage == 'fetched':
+                    stages.append(f"✅ Fetched odds for {info['events']} events")
+                elif stage == 'preprocessed':
+                    stages.append(f"✅ {info['matches']} matches ready" + (" (cached)" if info['cached'] else ""))
+                elif stage == 'analyzing':
+                    stages.append(f"⏳ Running {algorithm.upper()}...")
+                await progress.update("\n".join([header, "", *stages]))
             
             results = await process_pipeline(
                 api_key=SCRAPING_API_KEY,
                 base_url=SCRAPING_BASE_URL,
                 league_key=api_league_key,
                 algorithm=algorithm,
-                paid_user=self.user_manager.is_paid(user_id)
+                paid_user=self.user_manager.is_paid(user_id),
+                progress=on_stage,
+                ingestor=self.odds_ingestor
             )
             
             if 'error' in results:
+                progress.cancel()
                 await self.show_error(query, f"Analysis failed: {results['error']}")
                 return
             
-            formatted = format_results(results)
+            # Show each rendered section as it is ready; edits are coalesced by ProgressMessage
+            title = f"🏆 {display_name} Results\n📊 Method: {algorithm.upper()}\n\n"
+            sections = []
+            for section in iter_sections(results):
+                sections.append(section)
+                await progress.update(title + "\n".join(sections) + "\n\n⏳ More results coming...")
+            formatted = "\n".join(sections) or NO_RESULTS
             selections = []
             def safe_get(item, key, default="N/A"):
                 return item.get(key, default) or default
@@ -487,23 +551,25 @@ class BetSageAIBot:
                         'algorithm': 'value'
                     })
             
-            self.user_sessions[user_id]['current_selections'] = selections
+            self.user_sessions.setdefault(user_id, {})['current_selections'] = selections  # Session may have been evicted while queued
             
             if not self.wager_dump_manager.verify_league_alg_result(user_id):
+                progress.cancel()
                 await self.show_error(query, "No valid selections found")
                 return
             
-            await progress_msg.edit_text(
-                f"🏆 {self.league_manager.get_display_name(league_key)} Results\n📊 Method: {algorithm.upper()}\n\n{formatted}",
-                reply_markup=get_markup('wager_dump_actions')
-            )
+            await progress.finish(title + formatted, reply_markup=get_markup('wager_dump_actions'))
         
         except ValueError as e:
             logger.error(f"ValueError in algorithm selection: {str(e)}", exc_info=True)
+            if progress:
+                progress.cancel()
             await self.show_error(query, f"Invalid league: {str(e)}")
         
         except Exception as e:
             logger.error(f"Algorithm error: {str(e)}", exc_info=True)
+            if progress:
+                progress.cancel()
             await self.show_error(query, f"Analysis failed: {str(e)}")
         
     async def handle_pdf_strategy(self, query, context, values):
@@ -527,6 +593,19 @@ class BetSageAIBot:
         
         selected_markets = context.user_data.get('selected_markets', set())
         
+        if market != 'done' and market not in PDF_MARKETS:  # Buttons from an older keyboard
+            return await self.show_error(query, "This market is no longer supported")
+        
+        if market == 'done':
+            markets = set(selected_markets)
+            ticket = self.scheduler.submit(
+                user_id,
+                ('pdf', frozenset(markets)),
+                lambda: self._show_pdf_results(query, markets),
+                paid=self.user_manager.is_paid(user_id)
+            )
+            return await self._report_ticket(query, ticket)
+        
         if market in selected_markets:
             selected_markets.remove(market)
         else:
@@ -539,6 +618,40 @@ class BetSageAIBot:
             reply_markup=get_markup('market_selector', selected=selected_markets)
         )
 
+    async def _show_pdf_results(self, query, selected_markets: Set[str]):
+        """Show today's precomputed PDF strategy results for the selected markets"""
+        user_id = query.from_user.id
+        
+        if not selected_markets:
+            return await self.show_error(query, "No markets selected")
+        
+        await query.edit_message_text("⚙️ Loading PDF strategy results...")
+        
+        # Read-through the shared engine cache; only a cold miss runs the workflow here
+        entry = await asyncio.to_thread(self.pdf_engine.get_results, selected_markets)
+        
+        updated_at = entry['updated_at']
+        stamp = f"{updated_at:%Y-%m-%d %H:%M} UTC" if updated_at else "never"
+        lines = [
+            f"📚 PDF Strategy ({', '.join(sorted(selected_markets))})",
+            f"🕒 Last updated: {stamp}" + (" (refreshing...)" if entry['stale'] else ""),
+            ""
+        ]
+        for match in entry['results'][:10]:
+            analysis = match['analysis']
+            lines.append(
+                f"• {match['teams']} ({match['league']})\n"
+                f"  🎯 {analysis['prediction']} | Confidence: {analysis['confidence']:.0%}"
+            )
+        if not entry['results']:
+            lines.append("⏳ Today's results are being prepared, check back shortly" if entry['stale']
+                         else "❌ No qualifying matches today")
+        
+        await query.edit_message_text(
+            "\n".join(lines),
+            reply_markup=get_markup('main_menu', show_build_parlay=self.should_show_build_parlay(user_id))
+        )
+
     async def build_parlay(self, query, context):
         """Build optimized parlay from wager dump selections"""
         user_id = query.from_user.id
@@ -551,20 +664,17 @@ class BetSageAIBot:
             )
             return
         
-        await query.edit_message_text("🔍 Building optimal parlay...")
-        
-        # Use SmartParlayBuilder to generate the parlay
-        builder = SmartParlayBuilder()
-        parlay_combination = builder.generate_parlay(wager_dump)
+        # Parlays are precomputed once per wager dump; later clicks page through them
+        parlay_combination, position, batch_size = self.wager_dump_manager.next_parlay(user_id)
         
-        if not parlay_combination.selections:
+        if not parlay_combination or not parlay_combination.selections:
             await query.edit_message_text(
                 "❌ Could not build a suitable parlay.",
                 reply_markup=get_markup('main_menu', show_build_parlay=False)
             )
             return
         
-        parlay_text = "🎯 **Optimal Parlay**\n\n"
+        parlay_text = f"🎯 **Optimal Parlay** ({position}/{batch_size})\n\n"
         for idx, selection in enumerate(parlay_combination.selections, 1):
             parlay_text += (
                 f"{idx}. {selection.get('home_team')} vs {selection.get('away_team')}\n"
@@ -581,6 +691,15 @@ class BetSageAIBot:
             reply_markup=get_markup('parlay_actions')
         )
 
+    async def _report_ticket(self, query, ticket):
+        """Tell the user why a scheduled job was refused, or where it waits in the queue"""
+        if ticket.status == 'rate_limited':
+            await self.show_error(query, f"Too many requests, try again in {math.ceil(ticket.retry_after)}s")
+        elif ticket.status == 'busy':
+            await self.show_error(query, "The bot is busy, please try again shortly")
+        elif ticket.position:
+            await query.edit_message_text(f"⏳ Queued (position {ticket.position}), your results will follow...")
+
     async def show_error(self, query, message, show_build_parlay=False):
         """Show error message and return to main menu"""
         await query.edit_message_text(
@@ -588,19 +707,42 @@ class BetSageAIBot:
             reply_markup=get_markup('main_menu', show_build_parlay=show_build_parlay)
         )
 
-    async def _show_admin_stats(self, query):
+    async def _show_admin_stats(self, query, context):
         """Show admin statistics"""
         total_users = len(self.user_manager.get_all_users())
         paid_users = len(self.user_manager.get_paid_users())
         blocked_users = len(self.user_manager.get_blocked_users())
+        sessions = self.user_sessions.memory_report()
+        scheduler = self.scheduler.stats()
+        stored_matches = len(await self.db_manager.get_matches_with_odds_async())
+        decoded = await asyncio.to_thread(self.odds_processor.process_matches)
+        rule_matches = sum(1 for m in decoded if m['prediction'] != PDFOddsDecoder.NO_MATCH)
+        updates = context.application.update_processor
+        updates = updates.stats() if isinstance(updates, ChatOrderedUpdateProcessor) else None
         
         stats_text = (
             "📊 **Bot Statistics**\n\n"
             f"Total Users: {total_users}\n"
             f"Paid Users: {paid_users}\n"
-            f"Blocked Users: {blocked_users}\n\n"
+            f"Blocked Users: {blocked_users}\n"
+            f"Active Sessions: {sessions['sessions']} ({sessions['total_bytes'] / 1024:.0f} KiB)\n"
+            f"Stored Wager Dumps: {sessions['stored_dumps']}\n"
+            f"Stored Matches (next 3 days): {stored_matches}\n"
+            f"PDF Rule Matches (home odds): {rule_matches}\n"
+            f"Analyses: {scheduler['running']} running, {scheduler['queued']} queued, "
+            f"{scheduler['rate_limited']} rate limited\n\n"
             "Active since: 2023-01-15"
         )
+        if updates:
+            wait = updates['queue_wait']
+            stats_text += (
+                f"\n\nUpdates: {updates['running']} running, {updates['waiting']} waiting, "
+                f"{updates['processed']} processed\n"
+                f"Queue wait: p50 {wait['p50']:.0f} ms, p95 {wait['p95']:.0f} ms"
+            )
+            slowest = sorted(updates['handlers'].items(), key=lambda x: x[1]['p95'], reverse=True)[:5]
+            for label, h in slowest:
+                stats_text += f"\n{label}: {h['count']}x, p50 {h['p50']:.0f} ms, p95 {h['p95']:.0f} ms"
         
         await query.edit_message_text(
             stats_text,
@@ -614,9 +756,16 @@ def run():
     """Run the bot"""
     init_db()  # Initialize database
     
-    application = ApplicationBuilder().token(BOT_TOKEN).build()
+    # Chats are handled concurrently, each chat's updates in order
+    builder = ApplicationBuilder().token(BOT_TOKEN).concurrent_updates(
+        ChatOrderedUpdateProcessor(UPDATE_CONCURRENCY)
+    )
+    if BOT_MODE == 'webhook':
+        builder = builder.updater(None)  # Updates arrive over HTTP
+    application = builder.build()
     
     bot = BetSageAIBot()
+    bot.pdf_engine.start_precompute(PRECOMPUTED_MARKET_SETS)
     
     application.add_handler(CommandHandler("start", bot.handle_start))
     application.add_handler(CommandHandler("pay", bot.handle_payment))
@@ -624,8 +773,21 @@ def run():
     application.add_handler(CommandHandler("block", bot.block_user))
     application.add_handler(CallbackQueryHandler(bot.handle_callback))
     
-    logger.info("Starting bot...")
-    application.run_polling()
+    logger.info(f"Starting bot in {BOT_MODE} mode...")
+    if BOT_MODE == 'webhook':
+        asyncio.run(serve_webhook(
+            application,
+            url=WEBHOOK_URL,
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            path=WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+            drain_timeout=WEBHOOK_DRAIN_TIMEOUT,
+            scheduler=bot.scheduler
+        ))
+    else:
+        application.run_polling()
 
 if __name__ == "__main__":
     run()
\ No newline at end of file
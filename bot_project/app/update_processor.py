@@ -0,0 +1,124 @@
+"""Concurrent update processing that keeps each chat's updates in order"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Deque, Dict, List, Optional
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+# PTB's own semaphore is taken before do_process_update, so a chat waiting on
+# its lock would hold a slot; it is left effectively unbounded and the real
+# cap is applied after the chat lock instead.
+_UNBOUNDED = 2 ** 16
+SAMPLES = 512             # Recent samples kept per metric
+SLOW_UPDATE_SECONDS = 5   # Handlers slower than this are logged
+
+def update_label(update: object) -> str:
+    """Metric label of an update: callback action, command, or update type"""
+    if isinstance(update, Update):
+        if update.callback_query and update.callback_query.data:
+            return f"callback:{update.callback_query.data.split(':')[0]}"
+        text = update.message.text if update.message else None
+        if text and text.startswith('/'):
+            return text.split()[0].split('@')[0]
+        return 'message' if update.message else 'update'
+    return type(update).__name__
+
+def summarize(samples: Deque[float]) -> Dict[str, float]:
+    """p50/p95/max in milliseconds of recent samples"""
+    if not samples:
+        return {'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+    ordered = sorted(samples)
+    return {
+        'p50': round(ordered[len(ordered) // 2] * 1000, 1),
+        'p95': round(ordered[max(0, int(len(ordered) * 0.95) - 1)] * 1000, 1),
+        'max': round(ordered[-1] * 1000, 1)
+    }
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes up to `concurrency` updates at once. Updates of one chat wait
+    on that chat's lock before taking a slot, so a user's button presses are
+    handled one after another in arrival order while other chats proceed.
+    Records queue wait (arrival to start) and handler latency per label.
+    """
+
+    def __init__(self, concurrency: int):
+        super().__init__(_UNBOUNDED)
+        if concurrency < 1:
+            raise ValueError("concurrency must be a positive integer")
+        self.concurrency = concurrency
+        self._slots = asyncio.Semaphore(concurrency)
+        self._chats: Dict[int, List] = {}  # chat_id -> [lock, updates holding or awaiting it]
+        self._waiting = 0
+        self._running = 0
+        self._processed = 0
+        self._queue_wait: Deque[float] = deque(maxlen=SAMPLES)
+        self._latency: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+
+    @staticmethod
+    def _chat_id(update: object) -> Optional[int]:
+        if isinstance(update, Update) and update.effective_chat:
+            return update.effective_chat.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]):
+        arrived = time.perf_counter()
+        chat_id = self._chat_id(update)
+        self._waiting += 1
+        if chat_id is None:
+            async with self._slots:
+                await self._timed(update, coroutine, arrived)
+            return
+
+        entry = self._chats.setdefault(chat_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                async with self._slots:
+                    await self._timed(update, coroutine, arrived)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chats[chat_id]
+
+    async def _timed(self, update: object, coroutine: Awaitable[Any], arrived: float):
+        started = time.perf_counter()
+        self._waiting -= 1
+        self._running += 1
+        self._queue_wait.append(started - arrived)
+        try:
+            await coroutine
+        finally:
+            elapsed = time.perf_counter() - started
+            self._running -= 1
+            self._processed += 1
+            label = update_label(update)
+            self._latency.setdefault(label, deque(maxlen=SAMPLES)).append(elapsed)
+            self._counts[label] = self._counts.get(label, 0) + 1
+            if elapsed > SLOW_UPDATE_SECONDS:
+                logger.warning(f"Slow update {label}: {elapsed:.1f}s (waited {started - arrived:.1f}s)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Current load plus queue wait and per-label handler latency in milliseconds"""
+        return {
+            'concurrency': self.concurrency,
+            'running': self._running,
+            'waiting': self._waiting,
+            'processed': self._processed,
+            'queue_wait': summarize(self._queue_wait),
+            'handlers': {
+                label: {'count': self._counts[label], **summarize(samples)}
+                for label, samples in sorted(self._latency.items())
+            }
+        }
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
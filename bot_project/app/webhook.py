@@ -0,0 +1,117 @@
+"""Webhook mode: an embedded aiohttp server feeding updates to the Application"""
+import asyncio
+import hmac
+import logging
+import signal
+import time
+from typing import Optional
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+from utils.scheduler import FairScheduler
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+class WebhookServer:
+    """
+    Accepts Telegram webhook POSTs and puts each update on the application's
+    update queue; the response is sent as soon as the update is queued, so
+    Telegram never waits on a handler. While draining, new deliveries get a
+    503 and Telegram redelivers them to the next instance.
+    """
+
+    def __init__(self, application: Application, listen: str, port: int, path: str,
+                 secret_token: Optional[str] = None):
+        self.application = application
+        self.listen = listen
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.draining = False
+        self.received = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    def make_app(self) -> web.Application:
+        app = web.Application(client_max_size=1024 * 1024)
+        app.router.add_post(self.path, self.handle_update)
+        app.router.add_get('/healthz', self.handle_health)
+        return app
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        if self.draining:
+            return web.Response(status=503)
+        if self.secret_token and not hmac.compare_digest(
+            request.headers.get(SECRET_HEADER, ''), self.secret_token
+        ):
+            return web.Response(status=403)
+        try:
+            update = Update.de_json(await request.json(), self.application.bot)
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            logger.warning(f"Rejected malformed webhook update: {str(e)}")
+            return web.Response(status=400)
+        await self.application.update_queue.put(update)
+        self.received += 1
+        return web.Response()
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            'draining': self.draining,
+            'received': self.received,
+            'queued': self.application.update_queue.qsize()
+        })
+
+    async def start(self):
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.listen, self.port).start()
+        logger.info(f"Webhook server listening on {self.listen}:{self.port}{self.path}")
+
+    async def stop(self):
+        """Refuse new deliveries, then close the listener once in-flight requests finish"""
+        self.draining = True
+        if self._runner:
+            await self._runner.cleanup()
+
+async def serve_webhook(application: Application, url: str, listen: str, port: int, path: str,
+                        secret_token: Optional[str] = None, max_connections: int = 40,
+                        drain_timeout: float = 30, scheduler: Optional[FairScheduler] = None):
+    """
+    Run the application in webhook mode until SIGINT/SIGTERM, then drain:
+    stop accepting updates, let queued and running handlers finish, then the
+    scheduler's jobs, which edit messages through the still running bot.
+    Both share one drain_timeout deadline; jobs left at the deadline are
+    cancelled before shutdown. The webhook stays registered so Telegram
+    holds updates for the next start.
+    """
+    server = WebhookServer(application, listen, port, path, secret_token)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    async with application:
+        await application.start()
+        await server.start()
+        await application.bot.set_webhook(
+            url=f"{url.rstrip('/')}{path}",
+            secret_token=secret_token,
+            allowed_updates=Update.ALL_TYPES,
+            max_connections=max_connections
+        )
+        logger.info("Bot started in webhook mode")
+        await stop.wait()
+
+        logger.info("Draining webhook updates...")
+        deadline = time.monotonic() + drain_timeout
+        await server.stop()
+        try:
+            await asyncio.wait_for(application.update_queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Drain timed out after {drain_timeout}s with updates still pending")
+        if scheduler is not None:
+            if not await scheduler.drain(max(0.0, deadline - time.monotonic())):
+                logger.warning(f"Drain timed out after {drain_timeout}s with scheduled jobs still pending")
+            await scheduler.close()
+        await application.stop()
@@ -0,0 +1,132 @@
+"""SQLite throughput under concurrent ingestion and querying: default engine vs. tuned profile
+
+The writer and every reader run in their own process with their own
+engine, so they contend for the SQLite file lock rather than the GIL.
+Each write is one transaction of BATCH matches (with their observations),
+long enough for readers to run into it.
+
+Run from bot_project/: python -m benchmarks.db_concurrency_benchmark
+"""
+import logging
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from app.features.pdf_strategy.data.database import Base, LatestOdd, create_db_engine
+from app.features.pdf_strategy.data.db_connector import DatabaseManager, MATCHES_WITH_ODDS_QUERY, date_window
+from app.features.pdf_strategy.data.odds_ingestor import OddsIngestor
+from benchmarks.synthetic import raw_matches
+
+DURATION = 5.0
+READERS = 4
+BATCH = 500
+
+def upcoming(count):
+    """Synthetic events moved into the query window"""
+    raw = raw_matches(count, bookmakers=4)
+    start = datetime.now(timezone.utc) + timedelta(hours=1)
+    for i, event in enumerate(raw):
+        event['commence_time'] = (start + timedelta(minutes=i % 2000)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    return raw
+
+def open_db(path, tuned):
+    engine = create_db_engine(f"sqlite:///{path}", tuned=tuned)
+    return engine, DatabaseManager(sessionmaker(bind=engine))
+
+def writer(path, tuned, batches, ready, go, results):
+    engine, db = open_db(path, tuned)
+    ready.release()
+    go.wait()
+    deadline = time.monotonic() + DURATION
+    written, errors, step = 0, 0, 0
+    while time.monotonic() < deadline:
+        try:
+            written += db.save_matches_with_odds(batches[step % len(batches)])
+        except OperationalError:
+            errors += 1
+        step += 1
+    engine.dispose()
+    results.put(('writer', written, errors, []))
+
+def reader(path, tuned, match_ids, seed, ready, go, results):
+    engine, db = open_db(path, tuned)
+    ready.release()
+    go.wait()
+    deadline = time.monotonic() + DURATION
+    latencies, errors, step = [], 0, seed
+    while time.monotonic() < deadline:
+        step += 1
+        started = time.perf_counter()
+        try:
+            with db.session_scope() as session:
+                if step % 10 == 0:
+                    session.execute(MATCHES_WITH_ODDS_QUERY, date_window(3)).fetchall()
+                else:
+                    ids = match_ids[(step * 37) % len(match_ids):][:20]
+                    session.execute(select(LatestOdd).where(LatestOdd.match_id.in_(ids))).fetchall()
+            latencies.append(time.perf_counter() - started)
+        except OperationalError:
+            errors += 1
+    engine.dispose()
+    results.put(('reader', len(latencies), errors, latencies))
+
+def run_profile(path, tuned, raw):
+    engine, db = open_db(path, tuned)
+    Base.metadata.create_all(engine)
+    ingestor = OddsIngestor(db, ['bet365'], batch_size=BATCH)
+    ingestor.ingest(raw, datetime.now(timezone.utc))
+    engine.dispose()
+
+    # Rows are prepared up front so the timed loop measures the database, not extraction
+    now = datetime.now(timezone.utc)
+    batches = [
+        ingestor.snapshot_rows(raw[start:start + BATCH], now + timedelta(seconds=start))
+        for start in range(0, len(raw), BATCH)
+    ]
+    match_ids = [event['id'] for event in raw]
+
+    ctx = multiprocessing.get_context('fork')
+    ready, go, results = ctx.Semaphore(0), ctx.Event(), ctx.Queue()
+    procs = [ctx.Process(target=writer, args=(path, tuned, batches, ready, go, results))] + [
+        ctx.Process(target=reader, args=(path, tuned, match_ids, i * 1000, ready, go, results))
+        for i in range(READERS)
+    ]
+    for p in procs:
+        p.start()
+    for _ in procs:
+        ready.acquire()
+    go.set()
+    outcomes = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    latencies = sorted(x for role, _, _, lat in outcomes if role == 'reader' for x in lat)
+    return {
+        'writes': sum(n for role, n, _, _ in outcomes if role == 'writer'),
+        'reads': len(latencies),
+        'write_errors': sum(e for role, _, e, _ in outcomes if role == 'writer'),
+        'read_errors': sum(e for role, _, e, _ in outcomes if role == 'reader'),
+        'p50': statistics.median(latencies) if latencies else 0.0,
+        'p99': latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0,
+        'max': latencies[-1] if latencies else 0.0
+    }
+
+def main():
+    logging.disable(logging.INFO)
+    raw = upcoming(5000)
+    print(f"1 writer ({BATCH} matches per transaction) and {READERS} reader processes, {DURATION:.0f} s per profile")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, tuned in (('default', False), ('tuned', True)):
+            c = run_profile(os.path.join(tmp, f"{label}.db"), tuned, raw)
+            print(f"{label:<8} writes {c['writes'] / DURATION:>8,.0f} matches/s  "
+                  f"reads {c['reads'] / DURATION:>8,.1f} queries/s  "
+                  f"read latency p50 {c['p50'] * 1000:6.1f} ms  p99 {c['p99'] * 1000:7.1f} ms  "
+                  f"max {c['max'] * 1000:7.1f} ms  errors w={c['write_errors']} r={c['read_errors']}")
+
+if __name__ == "__main__":
+    main()
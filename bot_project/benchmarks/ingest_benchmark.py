@@ -0,0 +1,57 @@
+"""Odds ingestion benchmark: bulk upserts (with history) vs. row-by-row ORM merges on SQLite
+
+Run from bot_project/: python -m benchmarks.ingest_benchmark
+"""
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.features.pdf_strategy.data.database import Base, Match, Odd
+from app.features.pdf_strategy.data.db_connector import DatabaseManager
+from app.features.pdf_strategy.data.odds_ingestor import OddsIngestor
+from benchmarks.synthetic import raw_matches
+
+def fresh_manager(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    return DatabaseManager(sessionmaker(bind=engine))
+
+def legacy_ingest(db, rows):
+    """One ORM merge per row, the pattern the bulk path replaced"""
+    with db.session_scope() as session:
+        for row in rows:
+            session.merge(Match(**{k: row[k] for k in ('id', 'league', 'home_team', 'away_team', 'match_date', 'is_cup')}))
+            session.merge(Odd(match_id=row['id'], home_odds=row['home_odds'],
+                              draw_odds=row['draw_odds'], away_odds=row['away_odds']))
+
+def report(label, matches, table_rows, elapsed):
+    print(f"{label:<12} {matches:>6} matches {table_rows:>7} table rows  {elapsed * 1000:8.1f} ms  "
+          f"{table_rows / elapsed:>9,.0f} rows/s")
+
+def main():
+    raw = raw_matches(20000, bookmakers=4)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = fresh_manager(os.path.join(tmp, 'bulk.db'))
+        ingestor = OddsIngestor(db, ['bet365', 'pinnacle'])
+        start = time.perf_counter()
+        rows = ingestor.snapshot_rows(raw, datetime.now(timezone.utc))
+        elapsed = time.perf_counter() - start
+        # matches + odds + history + latest_odds
+        table_rows = 2 * len(rows) + 2 * sum(len(r['observations']) for r in rows)
+        report('extract', len(rows), table_rows, elapsed)
+        for label in ('bulk insert', 'bulk update'):
+            start = time.perf_counter()
+            for chunk in ingestor._chunks(rows):
+                db.save_matches_with_odds(chunk)
+            report(label, len(rows), table_rows, time.perf_counter() - start)
+
+        legacy_db = fresh_manager(os.path.join(tmp, 'legacy.db'))
+        sample = rows[:2000]
+        start = time.perf_counter()
+        legacy_ingest(legacy_db, sample)
+        report('orm merge', len(sample), 2 * len(sample), time.perf_counter() - start)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""IPT benchmark: batched array model vs. the original per-match loop
+
+Run from bot_project/: python -m benchmarks.ipt_benchmark
+"""
+import timeit
+import numpy as np
+from app.features.algorithms.ipt import implied_probability_threshold_model
+from benchmarks.synthetic import processed_matches
+
+def legacy_ipt(matches, threshold=0.4):
+    """The per-match loop the batched model replaced"""
+    predictions = []
+    for match in matches:
+        try:
+            home_prob = np.median([1/o for o in match['home_odds']])
+            away_prob = np.median([1/o for o in match['away_odds']])
+            draw_prob = np.median([1/o for o in match['draw_odds']])
+            total = home_prob + away_prob + draw_prob
+            home_prob /= total
+            away_prob /= total
+            predictions.append({
+                'match_id': match['match_id'],
+                'prediction': "Home Win" if home_prob > threshold else "Away Win" if away_prob > threshold else "No Clear Favorite",
+                'home_prob': round(home_prob, 2),
+                'away_prob': round(away_prob, 2)
+            })
+        except Exception:
+            continue
+    return predictions
+
+def main():
+    for count in (100, 1000, 10000):
+        matches = processed_matches(count)
+        runs = max(1, 2000 // count)
+        legacy = timeit.timeit(lambda: legacy_ipt(matches), number=runs) / runs
+        batched = timeit.timeit(lambda: implied_probability_threshold_model(matches), number=runs) / runs
+        print(f"{count:>6} matches  loop {legacy * 1000:8.2f} ms  batched {batched * 1000:8.2f} ms  x{legacy / batched:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Wager dump benchmark: dict selections vs. slotted Selection records (memory, filtering, batch)
+
+Run from bot_project/: python -m benchmarks.parlay_benchmark
+"""
+import random
+import time
+import tracemalloc
+from app.features.accumulator import SmartParlayBuilder
+from app.features.selections import Selection
+from benchmarks.synthetic import LEAGUES
+
+def dict_selections(count: int, matches: int, seed: int = 7):
+    """Dump entries in the shape add_to_dump used to store"""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        m = rng.randrange(matches)
+        home, away = f"Home {m}", f"Away {m}"
+        rows.append({
+            'league': LEAGUES[m % len(LEAGUES)],
+            'home_team': home,
+            'away_team': away,
+            'market': 'match_winner',
+            'selection': rng.choice((home, away, 'Draw')),
+            'odds': round(rng.uniform(1.3, 5.0), 2),
+            'team_type': rng.choice(('home', 'away', 'draw')),
+            'algorithm': rng.choice(('ipt', 'monte_carlo', 'value_bets'))
+        })
+    return rows
+
+def legacy_filter(selections, max_odds):
+    """Dict filter and tuple-key dedupe, the pattern the column path replaced"""
+    filtered = [s for s in selections
+                if s.get('market') == 'match_winner' and 1.01 < s.get('odds', 0) <= max_odds]
+    unique = {}
+    for s in filtered:
+        key = (s['home_team'], s['away_team'])
+        if key not in unique or s['odds'] < unique[key]['odds']:
+            unique[key] = s
+    return list(unique.values())
+
+def measure(label, build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<20} {elapsed * 1000:8.1f} ms  {size / 1024:9.0f} KiB")
+    return value
+
+def timed(label, fn, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    print(f"{label:<20} {(time.perf_counter() - start) / repeat * 1000:8.1f} ms  {len(result):>9} kept")
+    return result
+
+def main():
+    count, matches = 50000, 2000
+    template = dict_selections(count, matches)
+    # Fresh strings per entry, as they arrive from separate algorithm runs
+    fresh = lambda row: {k: (v + '.')[:-1] if isinstance(v, str) else v for k, v in row.items()}
+    dicts = measure('dict dump', lambda: [fresh(row) for row in template])
+    records = measure('record dump', lambda: [Selection.from_dict(fresh(row)) for row in template])
+
+    builder = SmartParlayBuilder()
+    legacy = timed('dict filter', lambda: legacy_filter(dicts, builder.max_individual_odds))
+    column = timed('column filter', lambda: builder._filter_selections(records))
+    assert [(s['home_team'], s['odds']) for s in legacy] == [(s.home_team, s.odds) for s in column]
+    timed('batch', lambda: builder.generate_batch(records), repeat=1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""PDF strategy benchmark: batch extraction + vectorized decoding vs. the per-match path
+
+Run from bot_project/: python -m benchmarks.pdf_extraction_benchmark
+"""
+import logging
+import timeit
+from datetime import datetime
+from app.features.pdf_strategy.data.pdf_strategy_engine import PdfStrategyEngine
+from app.features.pdf_strategy.rules.odds_decoder import PDFOddsDecoder
+from benchmarks.synthetic import raw_matches
+
+logger = logging.getLogger('benchmark.legacy')
+
+def legacy_process(raw, selected_markets, decoder, target_bookmaker='bet365', min_confidence=0.75):
+    """The per-match extraction and decoding the batch stage replaced"""
+    processed = []
+    for match in raw:
+        logger.debug(f"Processing match: {match.get('id', 'unknown')}")
+        bookmakers = match.get('bookmakers', [])
+        bookmaker = next((b for b in bookmakers if b['key'].lower() == target_bookmaker.lower()), bookmakers[0])
+        market_data = {m['key']: {o['name'].lower(): o['price'] for o in m['outcomes']} for m in bookmaker['markets']}
+        odds = {
+            'home': market_data.get('h2h', {}).get(match['home_team'].lower(), 0.0),
+            'away': market_data.get('h2h', {}).get(match['away_team'].lower(), 0.0),
+            'draw': market_data.get('h2h', {}).get('draw', 0.0),
+            'over_2.5': market_data.get('totals', {}).get('over', 0.0),
+            'under_2.5': market_data.get('totals', {}).get('under', 0.0),
+            'btts_yes': market_data.get('btts', {}).get('yes', 0.0),
+            'btts_no': market_data.get('btts', {}).get('no', 0.0)
+        }
+        logger.debug(f"Extracted odds for {match['id']}: {odds}")
+        month = datetime.fromisoformat(match['commence_time'].replace('Z', '+00:00')).month
+        markets = {
+            market: decoder.analyze_odds(odds[market], 8 <= month <= 10)
+            for market in ('home', 'away', 'draw', 'over_2.5', 'under_2.5')
+        }
+        best = max(markets.values(), key=lambda a: a['confidence'])
+        result = {
+            'match_id': match['id'],
+            'odds': odds,
+            'analysis': {'markets': markets, **best},
+            'profit_score': best['confidence'] * 0.65 + (odds['home'] + odds['away'] + odds['over_2.5']) / 3 * 0.35
+        }
+        logger.debug(f"Formatted result: {result}")
+        processed.append(result)
+    return sorted((m for m in processed if m['analysis']['confidence'] >= min_confidence),
+                  key=lambda x: x['profit_score'], reverse=True)
+
+def main():
+    engine = PdfStrategyEngine()
+    decoder = PDFOddsDecoder()
+    markets = {'h2h', 'totals'}
+    for count in (200, 2000):
+        raw = raw_matches(count, bookmakers=8)
+        runs = max(1, 4000 // count)
+        legacy = timeit.timeit(lambda: legacy_process(raw, markets, decoder), number=runs) / runs
+        batch = timeit.timeit(lambda: engine._process_and_analyze_matches(raw, markets), number=runs) / runs
+        print(f"{count:>5} matches  per-match {legacy * 1000:8.2f} ms  batch {batch * 1000:8.2f} ms  x{legacy / batch:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Update delivery benchmark: sequential polling vs. concurrent, per-chat ordered polling and webhook mode
+
+Runs a local stand-in for the Bot API (getMe, getUpdates, setWebhook, ...)
+so both modes use the real Application, Updater and WebhookServer code.
+Handlers sleep for HANDLER_MS to model awaiting the odds pipeline.
+
+Run from bot_project/: python -m benchmarks.webhook_benchmark
+"""
+import asyncio
+import socket
+import statistics
+import time
+from aiohttp import ClientSession, web
+from telegram.ext import ApplicationBuilder, MessageHandler, filters
+from app.update_processor import ChatOrderedUpdateProcessor
+from app.webhook import WebhookServer
+
+TOKEN = '123456:benchmark'
+UPDATES, CHATS, HANDLER_MS, CONCURRENCY = 600, 60, 20, 32
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def make_update(update_id: int, chat_id: int) -> dict:
+    user = {'id': chat_id, 'is_bot': False, 'first_name': f"user{chat_id}"}
+    return {'update_id': update_id, 'message': {
+        'message_id': update_id, 'date': int(time.time()), 'text': str(update_id),
+        'chat': {'id': chat_id, 'type': 'private'}, 'from': user
+    }}
+
+class FakeBotApi:
+    """Just enough of the Bot API for Application.initialize, polling and set_webhook"""
+
+    def __init__(self):
+        self.pending = []
+        self.arrived = asyncio.Event()
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        if method == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'bench', 'username': 'bench_bot'}
+        elif method == 'getUpdates':
+            params = dict(await request.post()) if request.can_read_body else {}
+            offset = int(params.get('offset') or 0)
+            self.pending = [u for u in self.pending if u['update_id'] >= offset]
+            if not self.pending:
+                self.arrived.clear()
+                try:
+                    await asyncio.wait_for(self.arrived.wait(), float(params.get('timeout') or 0) or 0.01)
+                except asyncio.TimeoutError:
+                    pass
+            result = self.pending[:100]
+        else:
+            result = True
+        return web.json_response({'ok': True, 'result': result})
+
+    def push(self, update: dict):
+        self.pending.append(update)
+        self.arrived.set()
+
+async def run_mode(mode: str, concurrent: bool = True) -> dict:
+    api, api_port = FakeBotApi(), free_port()
+    api_runner = web.AppRunner(api.make_app(), access_log=None)
+    await api_runner.setup()
+    await web.TCPSite(api_runner, '127.0.0.1', api_port).start()
+
+    builder = ApplicationBuilder().token(TOKEN).base_url(f"http://127.0.0.1:{api_port}/bot")
+    if concurrent:
+        builder = builder.concurrent_updates(ChatOrderedUpdateProcessor(CONCURRENCY))
+    if mode == 'webhook':
+        builder = builder.updater(None)
+    application = builder.build()
+
+    sent, latencies, order = {}, [], {}
+    finished = asyncio.Event()
+
+    async def handler(update, context):
+        await asyncio.sleep(HANDLER_MS / 1000)
+        update_id = update.update_id
+        latencies.append(time.perf_counter() - sent[update_id])
+        order.setdefault(update.effective_chat.id, []).append(update_id)
+        if len(latencies) == UPDATES:
+            finished.set()
+
+    application.add_handler(MessageHandler(filters.ALL, handler))
+    updates = [make_update(i + 1, 1000 + i % CHATS) for i in range(UPDATES)]
+
+    async with application:
+        await application.start()
+        start = time.perf_counter()
+        if mode == 'webhook':
+            port = free_port()
+            server = WebhookServer(application, '127.0.0.1', port, '/telegram')
+            await server.start()
+            async with ClientSession() as http:
+                async def post(update):
+                    sent[update['update_id']] = time.perf_counter()
+                    async with http.post(f"http://127.0.0.1:{port}/telegram", json=update) as resp:
+                        assert resp.status == 200
+                # Telegram delivers one chat's updates in order, several chats in parallel
+                for i in range(0, UPDATES, CHATS):
+                    await asyncio.gather(*(post(u) for u in updates[i:i + CHATS]))
+            await finished.wait()
+            await server.stop()
+        else:
+            await application.updater.start_polling(poll_interval=0, timeout=1)
+            for update in updates:
+                sent[update['update_id']] = time.perf_counter()
+                api.push(update)
+            await finished.wait()
+            await application.updater.stop()
+        elapsed = time.perf_counter() - start
+        await application.stop()
+    await api_runner.cleanup()
+
+    latencies.sort()
+    return {
+        'elapsed': elapsed,
+        'p50': statistics.median(latencies),
+        'p95': latencies[int(len(latencies) * 0.95) - 1],
+        'ordered': all(ids == sorted(ids) for ids in order.values()),
+        'wait': application.update_processor.stats()['queue_wait']['p95'] if concurrent else None
+    }
+
+def main():
+    print(f"{UPDATES} updates over {CHATS} chats, {HANDLER_MS} ms handlers, concurrency {CONCURRENCY}")
+    for label, mode, concurrent in (('polling, sequential', 'polling', False),
+                                    ('polling', 'polling', True), ('webhook', 'webhook', True)):
+        r = asyncio.run(run_mode(mode, concurrent))
+        wait = f"  queue wait p95 {r['wait']:6.0f} ms" if r['wait'] is not None else ""
+        print(f"{label:<20} {r['elapsed']:7.2f} s  {UPDATES / r['elapsed']:7.0f} updates/s  "
+              f"p50 {r['p50'] * 1000:7.0f} ms  p95 {r['p95'] * 1000:7.0f} ms  order kept: {r['ordered']}{wait}")
+
+if __name__ == "__main__":
+    main()
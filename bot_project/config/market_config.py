@@ -3,4 +3,18 @@ AVAILABLE_MARKETS = {
     'goals': ['over_0.5', 'over_1.5', 'over_2.5'],
     'specials': ['btts', 'corners', 'cards'],
     'halves': ['1st_half', '2nd_half']
-}
\ No newline at end of file
+}
+
+# Markets offered by the PDF strategy selector: key -> button label.
+# Keys are Odds API markets the decoder has columns for (PDFOddsDecoder.MARKET_OUTCOMES)
+PDF_MARKETS = {
+    'h2h': 'Match Result (1X2)',
+    'totals': 'Over/Under 2.5 Goals'
+}
+
+# Market sets precomputed for the PDF strategy on a schedule
+PRECOMPUTED_MARKET_SETS = [
+    ['h2h'],
+    ['h2h', 'totals']
+]
+PDF_REFRESH_INTERVAL = 1800  # Seconds between scheduled refreshes
\ No newline at end of file
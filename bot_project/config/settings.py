@@ -18,6 +18,40 @@ API_FOOTBALL_KEY = os.getenv("API_FOOTBALL_KEY")
 
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{PROJECT_ROOT}/data/BetSage.db")
+# Connection pool for server databases (PostgreSQL/MySQL); SQLite uses its own profile
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# Disk tier for preprocessed odds snapshots
+SNAPSHOT_CACHE_DIR = os.getenv("SNAPSHOT_CACHE_DIR", str(PROJECT_ROOT / "data" / "snapshots"))
+
+# User sessions: idle eviction, memory caps and the wager dump store
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", str(PROJECT_ROOT / "data" / "sessions.db"))
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", "3600"))
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "5000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Fair scheduling of expensive analyses (algorithm runs, PDF strategy results)
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "4"))
+SCHEDULER_RATE_PER_MINUTE = float(os.getenv("SCHEDULER_RATE_PER_MINUTE", "6"))
+SCHEDULER_BURST = float(os.getenv("SCHEDULER_BURST", "3"))
+SCHEDULER_PAID_WEIGHT = float(os.getenv("SCHEDULER_PAID_WEIGHT", "3"))
+SCHEDULER_MAX_QUEUE = int(os.getenv("SCHEDULER_MAX_QUEUE", "200"))
+
+# Updates handled concurrently in both modes; one chat's updates still run in order
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "32"))
+
+# Update delivery: "polling" (default) or "webhook" served by the embedded HTTP server
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # Public base URL Telegram posts to, e.g. https://bot.example.com
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "30"))
 
 # Validate required environment variables
 required_vars = {
@@ -28,5 +62,7 @@ required_vars = {
 }
 
 missing_vars = [var for var, value in required_vars.items() if not value]
+if BOT_MODE == "webhook" and not WEBHOOK_URL:
+    missing_vars.append("WEBHOOK_URL")
 if missing_vars:
     raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
\ No newline at end of file
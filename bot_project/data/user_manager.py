@@ -1,68 +1,185 @@
 import json
 import os
+import atexit
+import threading
 
 class UserManager:
+    """
+    Paid, blocked and admin users held as in-memory sets.
+    Changes are appended to a JSON-lines log by a write-behind thread and
+    folded into the JSON snapshot when the log grows, so the cost of a
+    change does not depend on the number of users. The snapshot is
+    replaced atomically, and a torn last log line is skipped on load.
+    """
     DATA_FILE = "data/user_data.json"
+    LOG_FILE = "data/user_data.log"
     CRYPTO_ADDRESS = "Hot Penis"
-    
-    def __init__(self):
-        os.makedirs(os.path.dirname(self.DATA_FILE), exist_ok=True)
-        self.data = self._load_data()
-        
+    SETS = ("paid_users", "blocked_users", "admin_ids")
+    FLUSH_INTERVAL = 1.0      # Seconds between write-behind flushes
+    COMPACT_AFTER = 10000     # Log entries before the snapshot is rewritten
+
+    def __init__(self, data_file: str = None, log_file: str = None):
+        self.data_file = data_file or self.DATA_FILE
+        self.log_file = log_file or self.LOG_FILE
+        os.makedirs(os.path.dirname(self.data_file) or ".", exist_ok=True)
+        self._lock = threading.Lock()        # Guards in-memory state and the pending batch
+        self._flush_lock = threading.Lock()  # Serializes log and snapshot writes
+        self._pending = []
+        self._wake = threading.Event()
+        self._closed = False
+        self.sets, self.preferences = self._load_data()
+        self._log_entries = self._replay_log()
+        self._writer = threading.Thread(target=self._write_behind, name="user-store", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
     def _load_data(self):
         try:
-            with open(self.DATA_FILE) as f:
-                return json.load(f)
+            with open(self.data_file) as f:
+                data = json.load(f)
         except (FileNotFoundError, json.JSONDecodeError):
-            return {"paid_users": [], "blocked_users": [], "admin_ids": ["YOUR_ADMIN_ID"]}
-            
-    def _save_data(self):
-        with open(self.DATA_FILE, 'w') as f:
-            json.dump(self.data, f, indent=2)
+            data = {"paid_users": [], "blocked_users": [], "admin_ids": ["YOUR_ADMIN_ID"]}
+        sets = {name: set(map(str, data.get(name, []))) for name in self.SETS}
+        return sets, dict(data.get("users", {}))
+
+    def _replay_log(self) -> int:
+        """
+        Apply changes logged since the last snapshot; returns how many were read.
+        A torn tail from a crash mid-write is cut off so new appends start clean.
+        """
+        count = good = 0
+        try:
+            with open(self.log_file, "rb") as f:
+                for line in f:
+                    try:
+                        self._apply(json.loads(line))
+                    except (json.JSONDecodeError, UnicodeDecodeError, KeyError):
+                        break
+                    count += 1
+                    good += len(line)
+                torn = f.seek(0, os.SEEK_END) > good
+        except FileNotFoundError:
+            return 0
+        if torn:
+            with open(self.log_file, "r+b") as f:
+                f.truncate(good)
+        return count
+
+    def _apply(self, change: dict):
+        op, user = change["op"], change["id"]
+        if op == "add":
+            self.sets[change["set"]].add(user)
+        elif op == "remove":
+            self.sets[change["set"]].discard(user)
+        elif op == "prefs":
+            self.preferences[user] = change["value"]
+
+    def _record(self, change: dict):
+        """Apply in memory now, persist on the next write-behind flush"""
+        with self._lock:
+            self._apply(change)
+            self._pending.append(change)
+        self._wake.set()
+
+    def _write_behind(self):
+        while not self._closed:
+            self._wake.wait(self.FLUSH_INTERVAL)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Append pending changes to the log in one fsynced write; compact when it grows large"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            with open(self.log_file, "a") as f:
+                f.write("".join(json.dumps(change) + "\n" for change in batch))
+                f.flush()
+                os.fsync(f.fileno())
+            self._log_entries += len(batch)
+            if self._log_entries >= self.COMPACT_AFTER:
+                self._compact()
+
+    def _compact(self):
+        """
+        Atomically replace the snapshot with current state and start a new log.
+        Runs under the flush lock; changes made meanwhile stay pending for the new log.
+        """
+        with self._lock:
+            sets = {name: set(users) for name, users in self.sets.items()}
+            preferences = dict(self.preferences)
+        data = {name: sorted(users) for name, users in sets.items()}
+        data["users"] = preferences
+        tmp = f"{self.data_file}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.data_file)
+        open(self.log_file, "w").close()
+        self._log_entries = 0
+
+    def close(self):
+        """Flush and fold the log into the snapshot; called at exit"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self.flush()
+        with self._flush_lock:
+            if self._log_entries:
+                self._compact()
 
     def is_paid(self, user_id: int) -> bool:
-        return str(user_id) in self.data["paid_users"]
-    
+        return str(user_id) in self.sets["paid_users"]
+
     def is_blocked(self, user_id: int) -> bool:
-        return str(user_id) in self.data["blocked_users"]
-    
+        return str(user_id) in self.sets["blocked_users"]
+
     def is_admin(self, user_id: int) -> bool:
-        return str(user_id) in self.data["admin_ids"]
-    
+        return str(user_id) in self.sets["admin_ids"]
+
     def add_paid_user(self, user_id: int):
-        if str(user_id) not in self.data["paid_users"]:
-            self.data["paid_users"].append(str(user_id))
-            self._save_data()
-    
+        if str(user_id) not in self.sets["paid_users"]:
+            self._record({"op": "add", "set": "paid_users", "id": str(user_id)})
+
     def block_user(self, user_id: int):
-        if str(user_id) not in self.data["blocked_users"]:
-            self.data["blocked_users"].append(str(user_id))
-            self._save_data()
-    
+        if str(user_id) not in self.sets["blocked_users"]:
+            self._record({"op": "add", "set": "blocked_users", "id": str(user_id)})
+
     def get_crypto_address(self) -> str:
         return self.CRYPTO_ADDRESS
     def unblock_user(self, user_id: int):
-        if str(user_id) in self.data["blocked_users"]:
-            self.data["blocked_users"].remove(str(user_id))
-            self._save_data()
+        if str(user_id) in self.sets["blocked_users"]:
+            self._record({"op": "remove", "set": "blocked_users", "id": str(user_id)})
 
     def get_stats(self):
         return {
-            'total': len(self.data["paid_users"]) + len(self.data["blocked_users"]),
-            'paid': len(self.data["paid_users"]),
-            'blocked': len(self.data["blocked_users"])
+            'total': len(self.sets["paid_users"]) + len(self.sets["blocked_users"]),
+            'paid': len(self.sets["paid_users"]),
+            'blocked': len(self.sets["blocked_users"])
         }
 
     def list_users(self):
         return {
-            'paid': self.data["paid_users"],
-            'blocked': self.data["blocked_users"],
-            'admins': self.data["admin_ids"]
+            'paid': sorted(self.sets["paid_users"]),
+            'blocked': sorted(self.sets["blocked_users"]),
+            'admins': sorted(self.sets["admin_ids"])
         }
+
+    def get_all_users(self) -> set:
+        return self.sets["paid_users"] | self.sets["blocked_users"] | set(self.preferences)
+
+    def get_paid_users(self) -> set:
+        return set(self.sets["paid_users"])
+
+    def get_blocked_users(self) -> set:
+        return set(self.sets["blocked_users"])
     # Add to UserManager class
     def get_preferred_strategy(self, user_id: int) -> str:
-     return self.data['users'].get(str(user_id), 'strategy', 'betsage_ai')
+     return self.preferences.get(str(user_id), {}).get('strategy', 'betsage_ai')
 
     def set_preferred_strategy(self, user_id: int, strategy: str):
-        self.data['users'][str(user_id)] = {'strategy': strategy}
-        self._save_data()
\ No newline at end of file
+        self._record({"op": "prefs", "id": str(user_id), "value": {'strategy': strategy}})
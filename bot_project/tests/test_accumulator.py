@@ -0,0 +1,65 @@
+import itertools
+import math
+import random
+import pytest
+from app.features.accumulator import SmartParlayBuilder
+from app.features.selections import Selection
+
+def low_odds_dump(matches: int, seed: int = 7, odds=None):
+    """One short-priced match winner leg per match, like a large de-duplicated dump"""
+    rng = random.Random(seed)
+    return [
+        Selection(league='EPL', home_team=f"Home {m}", away_team=f"Away {m}", market='match_winner',
+                  selection=f"Home {m}", odds=odds or round(rng.uniform(1.3, 2.0), 2))
+        for m in range(matches)
+    ]
+
+def test_generate_batch_fills_count_from_large_low_odds_dump():
+    builder = SmartParlayBuilder()
+    batch = builder.generate_batch(low_odds_dump(2000), count=5)
+
+    assert len(batch) == 5
+    slips = [frozenset(s.match_key for s in parlay.selections) for parlay in batch]
+    assert len(set(slips)) == 5
+    for i, keys in enumerate(slips):
+        for other in slips[:i]:
+            assert len(keys & other) / len(keys | other) <= 0.5
+    for parlay in batch:
+        assert builder.min_total_odds <= parlay.total_odds <= builder.max_total_odds
+
+def test_generate_batch_stops_when_legs_run_out():
+    builder = SmartParlayBuilder()
+    # Every in-window slip is 4 of the 5 legs, so any two share too many matches
+    batch = builder.generate_batch(low_odds_dump(5, odds=2.0), count=5)
+
+    assert len(batch) == 1
+    assert len(batch[0].selections) == 4
+
+def test_search_parlays_meets_its_documented_bound():
+    builder = SmartParlayBuilder(max_legs=6)
+    rng = random.Random(3)
+    legs = [
+        Selection(league='EPL', home_team=f"Home {m}", away_team=f"Away {m}", market='match_winner',
+                  selection=f"Home {m}", odds=round(rng.uniform(1.2, 3.5), 2))
+        for m in range(14)
+    ]
+    slack = builder.max_legs * builder.resolution
+    low = math.log(builder.min_total_odds) + slack
+    high = math.log(builder.max_total_odds) - slack
+    exact = max(
+        sum(builder._leg_score(s) for s in combo)
+        for size in range(1, builder.max_legs + 1)
+        for combo in itertools.combinations(legs, size)
+        if low <= sum(math.log(s.odds) for s in combo) <= high
+    )
+
+    best = builder.search_parlays(legs)[0]
+
+    assert builder.min_total_odds <= best.total_odds <= builder.max_total_odds
+    assert best.score >= exact - 1e-9
+
+def test_expected_value_requires_a_model_probability():
+    builder = SmartParlayBuilder(objective='expected_value')
+
+    with pytest.raises(ValueError):
+        builder.search_parlays(low_odds_dump(10))
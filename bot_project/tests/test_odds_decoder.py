@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from app.features.pdf_strategy.rules.odds_decoder import PDFOddsDecoder
+
+# Rule edges and the half-cent prices either side of them, where rounding decides the rule
+BOUNDARIES = sorted({
+    round(edge + offset, 3)
+    for low, high in PDFOddsDecoder.RULES
+    for edge in (low, high)
+    for offset in (-0.015, -0.01, -0.005, 0.0, 0.005, 0.01, 0.015)
+} | {1.095, 1.295, 1.445, 1.615})
+
+@pytest.mark.parametrize('season_start', [False, True])
+def test_batch_matches_scalar_at_rule_boundaries(season_start):
+    decoder = PDFOddsDecoder()
+    batch = decoder.analyze_batch(BOUNDARIES, season_start)
+
+    for i, odds in enumerate(BOUNDARIES):
+        scalar = decoder.analyze_odds(odds, season_start)
+        assert batch['prediction'][i] == scalar['prediction'], odds
+        assert batch['confidence'][i] == scalar['confidence'], odds
+        assert batch['original_odds'][i] == scalar['original_odds'], odds
+
+def test_halves_round_up():
+    decoder = PDFOddsDecoder()
+
+    assert decoder.analyze_odds(1.095, False)['prediction'] == 'under_1.5_ht'
+    assert decoder.analyze_odds(1.445, False)['prediction'] == PDFOddsDecoder.NO_MATCH
+    assert list(decoder.analyze_batch(np.array([1.295, 1.615]))['original_odds']) == [1.30, 0.0]
+
+def test_selector_offers_only_decodable_markets():
+    from config.market_config import PDF_MARKETS, PRECOMPUTED_MARKET_SETS
+
+    assert set(PDF_MARKETS) <= set(PDFOddsDecoder.MARKET_OUTCOMES)
+    for markets in PRECOMPUTED_MARKET_SETS:
+        assert set(markets) <= set(PDF_MARKETS)
@@ -1,40 +1,283 @@
-"""Thread-safe cache implementation with TTL support"""
+"""Bounded, thread- and async-safe LRU cache with per-entry TTL and counters"""
+import asyncio
+import logging
+import random
 import threading
 import time
-from datetime import datetime
-from typing import Any, Optional, Dict
-
-class SimpleCache:
-    def __init__(self, ttl: int = 300):
-        self._cache: Dict[str, tuple[Any, float]] = {}
-        self._ttl = ttl
-        self._lock = threading.Lock()
-        self._cleanup_interval = 60  # Seconds between cleanups
-        self._schedule_cleanup()
-
-    def _schedule_cleanup(self):
-        """Periodic cache maintenance"""
-        timer = threading.Timer(self._cleanup_interval, self._schedule_cleanup)
-        timer.daemon = True
-        timer.start()
-        self.cleanup()
-
-    def cleanup(self):
-        """Remove expired entries"""
-        now = time.time()
-        with self._lock:
-            expired = [k for k, (_, exp) in self._cache.items() if exp < now]
-            for key in expired:
-                del self._cache[key]
-
-    def get(self, key: str) -> Optional[Any]:
-        """Retrieve cached value if exists and valid"""
-        with self._lock:
-            entry = self._cache.get(key)
-            return entry[0] if entry and entry[1] > time.time() else None
-
-    def set(self, key: str, value: Any):
-        """Store value with expiration timestamp"""
-        expires = time.time() + self._ttl
-        with self._lock:
-            self._cache[key] = (value, expires)
\ No newline at end of file
+import weakref
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+COUNTERS = ('hits', 'misses', 'evictions', 'expirations', 'stale_hits', 'refreshes')
+MIN_SHARD_ENTRIES = 256  # Smaller caches get fewer shards, down to a single one
+
+class _Shard:
+    """One independently locked slice of a cache; counters are only touched under its lock"""
+    __slots__ = ('entries', 'lock') + COUNTERS
+
+    def __init__(self):
+        # key -> (value, expires_at, fresh_until)
+        self.entries: "OrderedDict[Hashable, Tuple[Any, float, float]]" = OrderedDict()
+        self.lock = threading.Lock()
+        for name in COUNTERS:
+            setattr(self, name, 0)
+
+class LRUCache:
+    """
+    Size-bounded LRU cache split into independently locked shards.
+    - Each shard holds max_entries / shards entries, so keys hashing
+      unevenly evict a little early; the shard count is reduced until each
+      shard holds at least MIN_SHARD_ENTRIES, which makes small caches a
+      single exact LRU.
+    - Expiry is lazy: an expired entry is dropped when it is read, and the
+      shared maintenance task sweeps one shard per tick instead of the
+      whole cache under one lock.
+    - Lock hold times are a dict lookup, so the sync API is safe to call
+      from coroutines; get_or_load_async also collapses concurrent misses
+      for one key into a single load.
+    - Entries may carry a soft TTL below the hard one. get_or_refresh serves
+      a soft-expired value immediately and starts one background reload.
+      Both TTLs are spread by up to +/- jitter so keys written together do
+      not expire together.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300, shards: int = 8,
+                 name: Optional[str] = None, jitter: float = 0.0):
+        self.name = name or f"cache-{id(self):x}"
+        self.ttl = ttl
+        self.jitter = jitter
+        self.max_entries = max_entries
+        shards = max(1, min(shards, max_entries // MIN_SHARD_ENTRIES))
+        self._shard_limit = max(1, -(-max_entries // shards))  # Ceiling, never below max_entries in total
+        self._shards = [_Shard() for _ in range(shards)]
+        self._sweep_cursor = 0
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+        self._refreshing: Dict[Hashable, Any] = {}  # key -> background task or thread
+        self._refresh_lock = threading.Lock()
+        _register(self)
+
+    def _shard(self, key: Hashable) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Value for key, refreshing its LRU position; default when absent or hard-expired"""
+        value, _ = self._lookup(key, default)
+        return value
+
+    def _lookup(self, key: Hashable, default: Any = None) -> Tuple[Any, bool]:
+        """(value, fresh); (default, False) when absent or hard-expired"""
+        shard = self._shard(key)
+        now = time.monotonic()
+        with shard.lock:
+            entry = shard.entries.get(key, _MISSING)
+            if entry is _MISSING:
+                shard.misses += 1
+                return default, False
+            value, expires, fresh_until = entry
+            if expires <= now:
+                del shard.entries[key]
+                shard.expirations += 1
+                shard.misses += 1
+                return default, False
+            shard.entries.move_to_end(key)
+            shard.hits += 1
+            if fresh_until <= now:
+                shard.stale_hits += 1
+                return value, False
+            return value, True
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, soft_ttl: Optional[float] = None):
+        """
+        Store value for ttl seconds (cache default when None), evicting the LRU
+        entry if full. After soft_ttl seconds the value is stale but still served.
+        """
+        now = time.monotonic()
+        spread = 1 + random.uniform(-self.jitter, self.jitter) if self.jitter else 1.0
+        ttl = (self.ttl if ttl is None else ttl) * spread
+        soft_ttl = ttl if soft_ttl is None else min(soft_ttl * spread, ttl)
+        shard = self._shard(key)
+        with shard.lock:
+            shard.entries[key] = (value, now + ttl, now + soft_ttl)
+            shard.entries.move_to_end(key)
+            while len(shard.entries) > self._shard_limit:
+                shard.entries.popitem(last=False)
+                shard.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        """Drop one key; True when it was present"""
+        shard = self._shard(key)
+        with shard.lock:
+            return shard.entries.pop(key, _MISSING) is not _MISSING
+
+    def clear(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        """True when key holds a value that is not hard-expired; does not touch LRU order or counters"""
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            return entry is not None and entry[1] > time.monotonic()
+
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None,
+                    soft_ttl: Optional[float] = None) -> Any:
+        """Cached value or the loader's result, which is cached unless it is None"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            if value is not None:
+                self.set(key, value, ttl, soft_ttl)
+        return value
+
+    async def get_or_load_async(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                                ttl: Optional[float] = None, soft_ttl: Optional[float] = None) -> Any:
+        """Async get_or_load; concurrent callers missing the same key await one load"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        return await self._load_async(key, loader, ttl, soft_ttl)
+
+    def get_or_refresh(self, key: Hashable, loader: Callable[[], Any], soft_ttl: float,
+                       ttl: Optional[float] = None) -> Any:
+        """
+        Stale-while-revalidate read. Fresh values return directly; stale ones
+        return immediately while a single daemon thread reloads the key; only
+        a miss waits for the loader.
+        """
+        value, fresh = self._lookup(key, _MISSING)
+        if value is _MISSING:
+            return self.get_or_load(key, loader, ttl, soft_ttl)
+        if not fresh:
+            with self._refresh_lock:
+                if key not in self._refreshing:
+                    thread = threading.Thread(
+                        target=self._refresh, args=(key, loader, ttl, soft_ttl),
+                        name=f"{self.name}-refresh", daemon=True
+                    )
+                    self._refreshing[key] = thread
+                    thread.start()
+        return value
+
+    async def get_or_refresh_async(self, key: Hashable, loader: Callable[[], Awaitable[Any]], soft_ttl: float,
+                                   ttl: Optional[float] = None) -> Any:
+        """Async get_or_refresh; the background reload runs as one task on the running loop"""
+        value, fresh = self._lookup(key, _MISSING)
+        if value is _MISSING:
+            return await self._load_async(key, loader, ttl, soft_ttl)
+        if not fresh:
+            # Same lock as the thread path: one key may be refreshed from both
+            with self._refresh_lock:
+                if key not in self._refreshing:
+                    self._refreshing[key] = asyncio.get_running_loop().create_task(
+                        self._refresh_async(key, loader, ttl, soft_ttl)
+                    )
+        return value
+
+    def _refresh(self, key, loader, ttl, soft_ttl):
+        try:
+            value = loader()
+            if value is not None:
+                self.set(key, value, ttl, soft_ttl)
+                self._count_refresh(key)
+        except Exception as e:
+            logger.warning(f"Background refresh of {key!r} in {self.name} failed: {str(e)}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing.pop(key, None)
+
+    async def _refresh_async(self, key, loader, ttl, soft_ttl):
+        try:
+            value = await loader()
+            if value is not None:
+                self.set(key, value, ttl, soft_ttl)
+                self._count_refresh(key)
+        except Exception as e:
+            logger.warning(f"Background refresh of {key!r} in {self.name} failed: {str(e)}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing.pop(key, None)
+
+    def _count_refresh(self, key: Hashable):
+        shard = self._shard(key)
+        with shard.lock:
+            shard.refreshes += 1
+
+    async def _load_async(self, key, loader, ttl, soft_ttl) -> Any:
+        if key in self._loading:
+            return await asyncio.shield(self._loading[key])
+
+        future = self._loading[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await loader()
+            if value is not None:
+                self.set(key, value, ttl, soft_ttl)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._loading[key]
+
+    def sweep(self, max_shards: int = 1) -> int:
+        """Drop expired entries from the next max_shards shards; returns how many were removed"""
+        removed = 0
+        now = time.monotonic()
+        for _ in range(min(max_shards, len(self._shards))):
+            shard = self._shards[self._sweep_cursor]
+            self._sweep_cursor = (self._sweep_cursor + 1) % len(self._shards)
+            with shard.lock:
+                expired = [k for k, (_, expires, _) in shard.entries.items() if expires <= now]
+                for key in expired:
+                    del shard.entries[key]
+                shard.expirations += len(expired)
+            removed += len(expired)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus current size and hit rate"""
+        counters = {name: sum(getattr(shard, name) for shard in self._shards) for name in COUNTERS}
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'name': self.name,
+            'size': len(self),
+            'max_entries': self.max_entries,
+            **counters,
+            'hit_rate': round(counters['hits'] / lookups, 3) if lookups else 0.0
+        }
+
+# One maintenance thread for every cache in the process
+_caches: "weakref.WeakSet[LRUCache]" = weakref.WeakSet()
+_maintenance_lock = threading.Lock()
+_maintenance_thread: Optional[threading.Thread] = None
+MAINTENANCE_INTERVAL = 15  # Seconds between sweeps; each sweep visits one shard per cache
+
+def _register(cache: LRUCache):
+    global _maintenance_thread
+    with _maintenance_lock:
+        _caches.add(cache)
+        if _maintenance_thread is None:
+            _maintenance_thread = threading.Thread(target=_maintain, name="cache-maintenance", daemon=True)
+            _maintenance_thread.start()
+
+def _maintain():
+    while True:
+        time.sleep(MAINTENANCE_INTERVAL)
+        for cache in list(_caches):
+            try:
+                cache.sweep()
+            except Exception as e:
+                logger.error(f"Cache sweep failed for {cache.name}: {str(e)}")
+
+def cache_stats() -> List[Dict[str, Any]]:
+    """Stats of every live cache, for logging or an admin command"""
+    return [cache.stats() for cache in list(_caches)]
@@ -0,0 +1,204 @@
+"""Per-user fair scheduling and rate limiting for expensive bot jobs"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`"""
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> float:
+        """Spend one token; returns 0 on success, else seconds until one is available"""
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+@dataclass
+class Ticket:
+    """
+    Outcome of a submission. status is 'queued', 'duplicate', 'rate_limited'
+    or 'busy' (queue full or scheduler closed); position is 0 when the job started at once, else the number of
+    jobs that run before it plus one. retry_after is set when rate limited.
+    """
+    status: str
+    position: int = 0
+    retry_after: float = 0.0
+    done: Optional[asyncio.Future] = None
+
+@dataclass(order=True)
+class _Job:
+    finish: float
+    seq: int
+    user_id: int = field(compare=False)
+    key: Hashable = field(compare=False)
+    run: Callable[[], Awaitable[Any]] = field(compare=False)
+    start: float = field(compare=False)
+    done: asyncio.Future = field(compare=False)
+
+class FairScheduler:
+    """
+    Runs at most `workers` jobs at once and shares those slots between users
+    by start-time fair queuing: each job gets a virtual finish tag of
+    max(virtual time, user's last tag) + 1 / weight, and the smallest tag
+    runs next. A user who floods the queue only pushes their own tags out,
+    and paid users (weight paid_weight) get proportionally more slots.
+    - Each user has a token bucket (rate per second, burst capacity; both
+      scaled by weight); an empty bucket rejects with a retry delay.
+    - A job whose key matches one of the user's queued or running jobs is
+      dropped and shares that job's completion future.
+    - Jobs run as tasks on the running loop, so handlers return immediately.
+      The scheduler holds a reference to each task until it finishes;
+      drain() waits for queued and running jobs, close() cancels them.
+    """
+
+    def __init__(self, workers: int = 4, rate: float = 0.1, burst: float = 3,
+                 paid_weight: float = 3.0, max_queue: int = 200):
+        self.workers = workers
+        self.rate = rate
+        self.burst = burst
+        self.paid_weight = paid_weight
+        self.max_queue = max_queue
+        self._heap: List[_Job] = []
+        self._pending: Dict[Tuple[int, Hashable], _Job] = {}  # Queued and running, for dedupe
+        self._last_finish: Dict[int, float] = {}
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._virtual_time = 0.0
+        self._running = 0
+        self._tasks: Set[asyncio.Task] = set()  # Strong references; the loop only keeps weak ones
+        self._closed = False
+        self._seq = itertools.count()
+        self.counters = {'submitted': 0, 'started': 0, 'duplicates': 0, 'rate_limited': 0, 'busy': 0, 'failed': 0}
+
+    def submit(self, user_id: int, key: Hashable, run: Callable[[], Awaitable[Any]], paid: bool = False) -> Ticket:
+        """Queue run() for user_id; see Ticket for the possible outcomes"""
+        self.counters['submitted'] += 1
+        if self.counters['submitted'] % 256 == 0:
+            self._prune()
+        existing = self._pending.get((user_id, key))
+        if existing is not None:
+            self.counters['duplicates'] += 1
+            return Ticket('duplicate', self._position(existing), done=existing.done)
+        if self._closed or len(self._heap) >= self.max_queue:
+            self.counters['busy'] += 1
+            return Ticket('busy')
+
+        weight = self.paid_weight if paid else 1.0
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(self.rate * weight, self.burst * weight)
+        retry_after = bucket.take()
+        if retry_after:
+            self.counters['rate_limited'] += 1
+            return Ticket('rate_limited', retry_after=retry_after)
+
+        start = max(self._virtual_time, self._last_finish.get(user_id, 0.0))
+        job = _Job(
+            finish=start + 1 / weight, seq=next(self._seq), user_id=user_id, key=key, run=run,
+            start=start, done=asyncio.get_running_loop().create_future()
+        )
+        self._last_finish[user_id] = job.finish
+        self._pending[(user_id, key)] = job
+        heapq.heappush(self._heap, job)
+        position = self._position(job)
+        self._dispatch()
+        return Ticket('queued', 0 if job not in self._heap else position, done=job.done)
+
+    def _position(self, job: _Job) -> int:
+        """1-based place in the queue, 0 when the job is already running"""
+        if job.done.done() or job not in self._heap:
+            return 0
+        return 1 + sum(1 for other in self._heap if other < job)
+
+    def _dispatch(self):
+        while self._heap and self._running < self.workers:
+            job = heapq.heappop(self._heap)
+            self._virtual_time = max(self._virtual_time, job.start)
+            self._running += 1
+            self.counters['started'] += 1
+            task = asyncio.get_running_loop().create_task(self._run(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: _Job):
+        try:
+            result = await job.run()
+            if not job.done.done():
+                job.done.set_result(result)
+        except Exception as e:
+            self.counters['failed'] += 1
+            logger.error(f"Scheduled job {job.key!r} for user {job.user_id} failed: {str(e)}", exc_info=True)
+            if not job.done.done():
+                job.done.set_exception(e)
+                job.done.exception()  # Mark retrieved when nobody awaits it
+        except asyncio.CancelledError:
+            job.done.cancel()
+            raise
+        finally:
+            self._running -= 1
+            del self._pending[(job.user_id, job.key)]
+            self._dispatch()
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until queued and running jobs have finished, at most `timeout`
+        seconds. Returns False when jobs were still pending at the deadline.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._tasks:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            # Finishing jobs dispatch queued ones, so wait on whatever is running now
+            await asyncio.wait(set(self._tasks), timeout=remaining)
+        return True
+
+    async def close(self):
+        """Refuse new jobs, drop queued ones and cancel running ones"""
+        self._closed = True
+        while self._heap:
+            job = heapq.heappop(self._heap)
+            del self._pending[(job.user_id, job.key)]
+            job.done.cancel()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _prune(self):
+        """Drop fairness and rate state of users with nothing pending that it no longer affects"""
+        busy = {user_id for user_id, _ in self._pending}
+        for user_id in [u for u, tag in self._last_finish.items() if u not in busy and tag <= self._virtual_time]:
+            del self._last_finish[user_id]
+        for user_id in [u for u, bucket in self._buckets.items() if u not in busy and bucket.full()]:
+            del self._buckets[user_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'running': self._running,
+            'queued': len(self._heap),
+            'waiting_users': len({job.user_id for job in self._heap}),
+            **self.counters
+        }